@@ -0,0 +1,74 @@
+import argparse
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+from delay_progression import calculate_delay_progression, get_delay_progression
+
+
+def calculate_delay_progression_loop(data: pd.DataFrame, max_time_since_start: float) -> pd.DataFrame:
+    """The previous implementation of calculate_delay_progression with a Python loop over all rides."""
+    grouped = data.groupby("train_line_ride_id").agg({"time_minutes": list, "delay_in_min": list})
+    all_times = []
+    all_delays = []
+    for _, row in grouped.iterrows():
+        times = np.array(row["time_minutes"])
+        all_times.extend(times - np.min(times))
+        all_delays.extend(row["delay_in_min"])
+    result_df = pd.DataFrame({"time_since_start": all_times, "delay_in_min": all_delays})
+    result_df = result_df[result_df["time_since_start"] <= max_time_since_start]
+    avg_delay = result_df.groupby("time_since_start").agg({"delay_in_min": ["mean", "count"]}).reset_index()
+    avg_delay.columns = ["time_since_start", "mean_delay", "count"]
+    return avg_delay
+
+
+def create_synthetic_rides(con: duckdb.DuckDBPyConnection, num_rides: int) -> duckdb.DuckDBPyRelation:
+    """Rides with 2 to 30 stops a few minutes apart over one month, with delays growing along the ride."""
+    con.execute(f"""
+        CREATE TABLE rides AS
+        SELECT
+            CAST(r AS VARCHAR) AS train_line_ride_id,
+            TIMESTAMP '2025-01-01' + to_minutes(CAST(hash(r) % 44640 + s * (3 + hash(r, s) % 15) AS BIGINT)) AS time,
+            CAST(hash(r, s) % 5 + s // 3 AS INTEGER) AS delay_in_min,
+            hash(r, s, 1) % 30 = 0 AS is_canceled
+        FROM range({num_rides}) rides(r), range(30) stops(s)
+        WHERE s < 2 + hash(r) % 29
+    """)
+    return con.table("rides")
+
+
+def main(num_rides: int, max_time_since_start: float):
+    con = duckdb.connect()
+    release = create_synthetic_rides(con, num_rides)
+    data = (
+        release.filter("NOT is_canceled")
+        .project("train_line_ride_id, epoch(time - TIMESTAMP '2024-01-01') / 60 AS time_minutes, delay_in_min")
+        .df()
+    )
+    print(f"Benchmarking {num_rides:_} synthetic rides with {len(data):_} stops that were not canceled")
+
+    implementations = {
+        "loop (before)": lambda: calculate_delay_progression_loop(data, max_time_since_start),
+        "groupby transform": lambda: calculate_delay_progression(data, max_time_since_start),
+        "duckdb": lambda: get_delay_progression(release, max_time_since_start),
+    }
+    results = {}
+    for name, implementation in implementations.items():
+        start_time = time.perf_counter()
+        results[name] = implementation()
+        print(f"  {name:<18} {time.perf_counter() - start_time:8.2f} s")
+
+    expected = results["loop (before)"]
+    for name, result in results.items():
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    print("All implementations return identical curves")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the delay progression of the verspaetungsverlauf notebook")
+    parser.add_argument("--rides", type=int, default=200_000, help="Number of synthetic rides")
+    parser.add_argument("--max-time", type=float, default=300, help="Maximum minutes since the start of a ride")
+    args = parser.parse_args()
+
+    main(args.rides, args.max_time)
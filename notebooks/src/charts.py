@@ -0,0 +1,94 @@
+import json
+import math
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+
+def _to_json_value(value):
+    if isinstance(value, date):
+        return value.isoformat()[:10]
+    if isinstance(value, str):
+        return value
+    value = value.item() if hasattr(value, "item") else value
+    if isinstance(value, float):
+        return None if math.isnan(value) else round(value, 3)
+    return value
+
+
+# Hover and tick formats per y_format
+Y_FORMATS = {
+    "number": {"hover": "%{y:.2f}", "axis": {}},
+    "integer": {"hover": "%{y:,.0f}", "axis": {"tickformat": ",d"}},
+    "percent": {"hover": "%{y:.1f}%", "axis": {"ticksuffix": "%"}},
+}
+
+
+def get_chart(
+    kind: str,
+    series: dict[str, pd.Series],
+    title: str,
+    x_label: str,
+    y_label: str,
+    y_format: str = "number",
+    x_ticks: list | None = None,
+    x_range: tuple[float, float] | None = None,
+    y_range: tuple[float, float] | None = None,
+    markers: bool = False,
+) -> dict:
+    """A line or bar chart as Plotly figure JSON (data and layout) that templates/charts.js draws.
+
+    Args:
+        kind: "line" or "bar".
+        series: Series per legend entry, the index is the x-axis. Missing values interrupt lines.
+        y_format: Format of the y values, "number", "integer" (with thousands separators) or "percent".
+        x_ticks: x values that get a label (default: chosen by Plotly).
+        x_range: Initially shown part of the x-axis (default: all values).
+        y_range: Initially shown part of the y-axis (default: all values).
+        markers: Draw a marker for every point of a line.
+    """
+    traces = []
+    for name, values in series.items():
+        trace = {
+            "type": "bar" if kind == "bar" else "scatter",
+            "name": name,
+            "x": [_to_json_value(x) for x in values.index],
+            "y": [_to_json_value(y) for y in values.to_numpy()],
+            "hovertemplate": f"{Y_FORMATS[y_format]['hover']}<extra>{name}</extra>",
+        }
+        if kind == "line":
+            trace["mode"] = "lines+markers" if markers else "lines"
+        traces.append(trace)
+
+    x_axis = {"title": {"text": x_label}, "gridcolor": "#ddd"}
+    if x_ticks is not None:
+        x_axis.update(tickmode="array", tickvals=[_to_json_value(x) for x in x_ticks])
+    if x_range is not None:
+        x_axis["range"] = list(x_range)
+    y_axis = {"title": {"text": y_label}, "gridcolor": "#ddd", **Y_FORMATS[y_format]["axis"]}
+    if y_range is not None:
+        y_axis["range"] = list(y_range)
+
+    layout = {
+        "title": {"text": title},
+        "xaxis": x_axis,
+        "yaxis": y_axis,
+        "legend": {"orientation": "h", "x": 0, "y": 1.02, "yanchor": "bottom"},
+        "hovermode": "x unified",
+        "plot_bgcolor": "white",
+        "font": {"family": "sans-serif"},
+        "margin": {"l": 60, "r": 20, "t": 90, "b": 60},
+    }
+    if kind == "bar":
+        layout["barmode"] = "group"
+    return {"data": traces, "layout": layout}
+
+
+def write_chart(path: Path, kind: str, series: dict[str, pd.Series], title: str, **kwargs) -> Path:
+    """Write a chart of get_chart as JSON file for to_html.chart."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    chart = get_chart(kind, series, title, **kwargs)
+    path.write_text(json.dumps(chart, ensure_ascii=False, separators=(",", ":")))
+    return path
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+from pathlib import Path
+
+import duckdb
+
+SUM_COLUMNS = ["stops", "canceled_stops", "delay_sum_in_min", "punctual_stops"]
+
+
+def _get_month_files(day: date, aggregates_dir: Path | None) -> list[Path]:
+    aggregates_dir = Path(aggregates_dir or "../monthly_processed_data/daily_aggregates")
+    month_file = aggregates_dir / f"prefix-sums-{day:%Y-%m}.parquet"
+    return sorted(path for path in aggregates_dir.glob("prefix-sums-*.parquet") if path.name <= month_file.name)
+
+
+def get_chain_start(day: date, aggregates_dir: Path | None = None) -> date | None:
+    """First day counted in the running totals up to day, None if unknown or there are no totals yet."""
+    files = _get_month_files(day, aggregates_dir)
+    if not files:
+        return None
+    row = duckdb.sql(f"SELECT value FROM parquet_kv_metadata('{files[-1]}') WHERE key = 'chain_start'").fetchone()
+    return date.fromisoformat(f"{row[0].decode()}-01") if row else None
+
+
+def get_totals(
+    day: date, eva: str | None = None, train_type: str | None = None, aggregates_dir: Path | None = None
+) -> dict:
+    """Running totals from the first month up to and including day, summed over the matching stations and types."""
+    files = _get_month_files(day, aggregates_dir)
+    if not files:
+        return dict.fromkeys(SUM_COLUMNS, 0)
+
+    filters, params = ["date <= ?"], [day]
+    for column, value in [("eva", eva), ("train_type", train_type)]:
+        if value is not None:
+            filters.append(f"{column} = ?")
+            params.append(value)
+    row = duckdb.execute(
+        f"""
+        SELECT {", ".join(f"COALESCE(sum({column}), 0)" for column in SUM_COLUMNS)}
+        FROM (
+            SELECT DISTINCT ON (eva, train_type) *
+            FROM '{files[-1]}'
+            WHERE {" AND ".join(filters)}
+            ORDER BY eva, train_type, date DESC
+        )
+        """,
+        params,
+    ).fetchone()
+    return dict(zip(SUM_COLUMNS, (int(value) for value in row), strict=True))
+
+
+def get_range_stats(
+    start: date, end: date, eva: str | None = None, train_type: str | None = None, aggregates_dir: Path | None = None
+) -> dict:
+    """Stop count, cancellation rate, mean delay and punctuality between start and end (both inclusive).
+
+    Computed from the difference of the running totals at end and the day before start, so the cost
+    does not depend on the length of the range. Without eva or train_type, all stations or types are used.
+    Mean delay and punctuality (less than 6 minutes delay) only count stops that were not canceled.
+    Ranges that start before a restart of the running totals raise a ValueError.
+    """
+    chain_start = get_chain_start(end, aggregates_dir)
+    if chain_start is not None and start < chain_start:
+        raise ValueError(
+            f"The daily prefix sums restart at {chain_start}, rewrite them with "
+            "scripts/rebuild_months.py --daily-aggregates to query earlier days"
+        )
+    end_totals = get_totals(end, eva, train_type, aggregates_dir)
+    if chain_start is not None and start == chain_start:
+        start_totals = dict.fromkeys(SUM_COLUMNS, 0)
+    else:
+        start_totals = get_totals(start - timedelta(days=1), eva, train_type, aggregates_dir)
+    totals = {column: end_totals[column] - start_totals[column] for column in SUM_COLUMNS}
+
+    not_canceled = totals["stops"] - totals["canceled_stops"]
+    return {
+        "stops": totals["stops"],
+        "canceled_rate": totals["canceled_stops"] / totals["stops"] if totals["stops"] else None,
+        "mean_delay_in_min": totals["delay_sum_in_min"] / not_canceled if not_canceled else None,
+        "punctual_rate": totals["punctual_stops"] / not_canceled if not_canceled else None,
+    }
@@ -0,0 +1,55 @@
+import duckdb
+import pandas as pd
+
+
+def calculate_delay_progression(data: pd.DataFrame, max_time_since_start: float) -> pd.DataFrame:
+    """Calculate average delay progression over time since train start.
+
+    data needs the columns train_line_ride_id, time_minutes and delay_in_min. Returns the mean delay and
+    number of stops per minute since the first stop of the ride, up to max_time_since_start.
+    """
+    first_time = data.groupby("train_line_ride_id")["time_minutes"].transform("min")
+    result_df = pd.DataFrame(
+        {"time_since_start": data["time_minutes"] - first_time, "delay_in_min": data["delay_in_min"]}
+    )
+
+    # Filter by max_time_since_start
+    result_df = result_df[result_df["time_since_start"] <= max_time_since_start]
+
+    # Group by time_since_start and calculate mean delay and count
+    avg_delay = result_df.groupby("time_since_start").agg({"delay_in_min": ["mean", "count"]}).reset_index()
+    avg_delay.columns = ["time_since_start", "mean_delay", "count"]
+
+    return avg_delay
+
+
+def get_delay_progression(
+    release: duckdb.DuckDBPyRelation, max_time_since_start: float, where: str = "true"
+) -> pd.DataFrame:
+    """calculate_delay_progression of the stops that were not canceled, computed in DuckDB.
+
+    release needs the columns train_line_ride_id, time, delay_in_min and is_canceled. Only the curve is
+    materialized, so the memory use does not grow with the number of months in release.
+    """
+    return release.query(
+        "release",
+        f"""
+        WITH stops AS (
+            SELECT
+                train_line_ride_id,
+                epoch(time - TIMESTAMP '2024-01-01') / 60 AS time_minutes,
+                delay_in_min
+            FROM release
+            WHERE NOT is_canceled AND train_line_ride_id IS NOT NULL AND {where}
+        ),
+        progression AS (
+            SELECT time_minutes - min(time_minutes) OVER (PARTITION BY train_line_ride_id) AS time_since_start, delay_in_min
+            FROM stops
+        )
+        SELECT time_since_start, avg(delay_in_min) AS mean_delay, count(delay_in_min) AS count
+        FROM progression
+        WHERE time_since_start <= {max_time_since_start}
+        GROUP BY time_since_start
+        ORDER BY time_since_start
+        """,
+    ).df()
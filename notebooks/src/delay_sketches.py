@@ -0,0 +1,94 @@
+import math
+from datetime import date
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+# Must match HLL_PRECISION in scripts/create_monthly_data_release.py
+HLL_REGISTERS = 2**10
+
+
+def _get_sketches_query(
+    columns: str, start: date | None, end: date | None, eva: str | None, train_type: str | None, sketches_dir: Path
+) -> tuple[str, list]:
+    """The query of the matching sketches and its bound parameters."""
+    filters, params = ["true"], []
+    for condition, value in [
+        ("date >= ?", start),
+        ("date <= ?", end),
+        ("eva = ?", eva),
+        ("train_type = ?", train_type),
+    ]:
+        if value is not None:
+            filters.append(condition)
+            params.append(value)
+    sketches_dir = Path(sketches_dir or "../monthly_processed_data/sketches")
+    return f"SELECT {columns} FROM '{sketches_dir / 'sketches-*.parquet'}' WHERE {' AND '.join(filters)}", params
+
+
+def get_delay_distribution(
+    start: date | None = None,
+    end: date | None = None,
+    eva: str | None = None,
+    train_type: str | None = None,
+    sketches_dir: Path | None = None,
+) -> pd.Series:
+    """Number of stops that were not canceled per delay in minutes, merged from the daily sketches."""
+    sketches, params = _get_sketches_query(
+        "unnest(delay_histogram, recursive := true)", start, end, eva, train_type, sketches_dir
+    )
+    distribution = duckdb.execute(
+        f"""
+        SELECT delay_in_min, sum(stops) AS stops
+        FROM ({sketches})
+        GROUP BY delay_in_min
+        ORDER BY delay_in_min
+        """,
+        params,
+    ).df()
+    return distribution.set_index("delay_in_min")["stops"].astype("int64")
+
+
+def get_delay_quantiles(
+    quantiles: tuple[float, ...] = (0.5, 0.9, 0.99),
+    start: date | None = None,
+    end: date | None = None,
+    eva: str | None = None,
+    train_type: str | None = None,
+    sketches_dir: Path | None = None,
+) -> dict[float, int]:
+    """Exact delay quantiles in minutes, the smallest delay that at least a share q of the stops have."""
+    distribution = get_delay_distribution(start, end, eva, train_type, sketches_dir)
+    if distribution.empty:
+        return dict.fromkeys(quantiles)
+    cumulative = distribution.cumsum().to_numpy()
+    positions = np.searchsorted(cumulative, np.array(quantiles) * cumulative[-1], side="left")
+    return {q: int(distribution.index[position]) for q, position in zip(quantiles, positions, strict=True)}
+
+
+def get_distinct_rides(
+    start: date | None = None,
+    end: date | None = None,
+    eva: str | None = None,
+    train_type: str | None = None,
+    sketches_dir: Path | None = None,
+) -> float:
+    """HyperLogLog estimate of the number of distinct rides, merged from the daily sketches."""
+    sketches, params = _get_sketches_query(
+        "unnest(ride_registers, recursive := true)", start, end, eva, train_type, sketches_dir
+    )
+    merged = duckdb.execute(
+        f"SELECT register, max(rank) AS rank FROM ({sketches}) GROUP BY register", params
+    ).fetchnumpy()
+    registers = np.zeros(HLL_REGISTERS)
+    registers[merged["register"]] = merged["rank"]
+
+    m = HLL_REGISTERS
+    estimate = 0.7213 / (1 + 1.079 / m) * m**2 / np.sum(2.0**-registers)
+    empty_registers = np.count_nonzero(registers == 0)
+    # Linear counting is more accurate for small counts
+    if estimate <= 2.5 * m and empty_registers > 0:
+        return m * math.log(m / empty_registers)
+    return float(estimate)
@@ -1,40 +1,98 @@
 import argparse
-import re
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
 from pathlib import Path
 
 import nbformat
 from jinja2 import Environment, FileSystemLoader
 from nbconvert.preprocessors import ExecutePreprocessor
+from plotly.offline import get_plotlyjs
 
-PLOTLY_INLINE_PATTERN = re.compile(
-    r'<script type="text/javascript">window\.PlotlyConfig = \{MathJaxConfig: \'local\'\};</script>'
-    r'\s*<script[^>]*>.*?"use strict";var Plotly=.*?</script>',
-    re.DOTALL,
-)
+# Plotly.js bundle shared by all pages with plots, written next to them when no --plotly-url is given
+PLOTLY_ASSET = "plotly.min.js"
+# Script that draws the JSON charts of to_html.chart with Plotly.js, written next to the pages that have charts
+CHARTS_ASSET = "charts.js"
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+# Input files of a page are glob patterns relative to the repository root
+CUBE_INPUTS = ["monthly_processed_data/stats_cube/cube-*.parquet"]
 
 DEFAULT_PAGES = [
-    {"name": "allgemein", "filename": "allgemein", "display_name": "Allgemein"},
-    {"name": "zeitraum", "filename": "zeitraum", "display_name": "Zeitraum"},
-    {"name": "zugverbindung", "filename": "zugverbindung", "display_name": "Zugverbindung"},
-    {"name": "verspaetungsverlauf", "filename": "verspaetungsverlauf", "display_name": "Verspätungsverlauf"},
+    {"name": "allgemein", "filename": "allgemein", "display_name": "Allgemein", "inputs": CUBE_INPUTS},
+    {"name": "zeitraum", "filename": "zeitraum", "display_name": "Zeitraum", "inputs": CUBE_INPUTS},
+    {
+        "name": "zugverbindung",
+        "filename": "zugverbindung",
+        "display_name": "Zugverbindung",
+        "inputs": ["monthly_processed_data/stats_cube/trains-*.parquet"],
+    },
+    {
+        "name": "verspaetungsverlauf",
+        "filename": "verspaetungsverlauf",
+        "display_name": "Verspätungsverlauf",
+        "inputs": ["monthly_processed_data/data-*.parquet"],
+    },
     {
         "name": "verspaetung_pro_bahnhof",
         "filename": "verspaetung_pro_bahnhof",
         "display_name": "Verspätung pro Bahnhof",
+        "inputs": CUBE_INPUTS,
     },
     {
         "name": "zuggattungen_pro_bahnhof",
         "filename": "zuggattungen_pro_bahnhof",
         "display_name": "Zuggattungen pro Bahnhof",
+        "inputs": CUBE_INPUTS,
     },
-    {"name": "zuggattung", "filename": "zuggattung", "display_name": "Zuggattung"},
-    {"name": "bahnhof", "filename": "bahnhof", "display_name": "Bahnhof"},
+    {"name": "zuggattung", "filename": "zuggattung", "display_name": "Zuggattung", "inputs": CUBE_INPUTS},
+    # Built from the statistics cube by station_pages.py instead of a notebook
+    {"name": "bahnhof", "filename": "bahnhof", "display_name": "Bahnhof", "notebook": False},
 ]
 
 
-def strip_inline_plotly(content: str) -> str:
-    """Remove inline Plotly.js library from HTML content."""
-    return PLOTLY_INLINE_PATTERN.sub("", content)
+@cache
+def get_jinja_env() -> Environment:
+    return Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=False)
+
+
+def render_page(
+    title: str,
+    content: str,
+    current_page: str | None = None,
+    plotly_url: str | None = None,
+    charts_url: str | None = None,
+) -> str:
+    """Wrap HTML content in the page template with the header and footer navigation."""
+    template = get_jinja_env().get_template("page.html")
+    return template.render(
+        title=title,
+        content=content,
+        plotly_url=plotly_url,
+        charts_url=charts_url,
+        pages=DEFAULT_PAGES,
+        current_page=current_page,
+    )
+
+
+def uses_plotly(content: str) -> bool:
+    """Whether the HTML content contains plots of to_html.plot, which need Plotly.js on the page."""
+    return "Plotly.newPlot(" in content
+
+
+def uses_charts(content: str) -> bool:
+    """Whether the HTML content contains charts of to_html.chart, which need the charts script on the page."""
+    return 'class="chart" data-src=' in content
+
+
+def write_asset(output_dir: Path, name: str, content: str) -> str:
+    """Write an asset shared by the pages to the output directory if it changed and return its URL."""
+    asset_path = Path(output_dir) / name
+    if not asset_path.exists() or asset_path.read_text() != content:
+        asset_path.write_text(content)
+    return name
 
 
 def run_notebook(notebook_path: str) -> nbformat.NotebookNode:
@@ -47,6 +105,70 @@ def run_notebook(notebook_path: str) -> nbformat.NotebookNode:
     return nb
 
 
+@cache
+def get_file_hash(path: Path) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_build_hash(notebook_path: Path, input_patterns: list[str]) -> str:
+    """Hash of the code of a notebook, the src/ helpers and templates and the contents of its input files.
+
+    The templates are part of it because to_html renders them into the cell outputs.
+    """
+    build_hash = hashlib.sha256()
+    nb = nbformat.read(notebook_path, as_version=4)
+    for cell in nb.cells:
+        if cell.cell_type == "code":
+            build_hash.update(cell.source.encode())
+    for helper in sorted(Path(__file__).parent.glob("*.py")):
+        if helper.name != Path(__file__).name:
+            build_hash.update(helper.read_bytes())
+    for template in sorted(TEMPLATES_DIR.glob("*")):
+        build_hash.update(template.read_bytes())
+    for pattern in input_patterns:
+        for input_file in sorted(REPO_DIR.glob(pattern)):
+            build_hash.update(f"{input_file.relative_to(REPO_DIR)}:{get_file_hash(input_file)}".encode())
+    return build_hash.hexdigest()
+
+
+def execute_notebook(notebook_path: Path, build_hash: str) -> float:
+    """Execute a notebook in its own kernel, save it with the build hash and return the seconds it took."""
+    start_time = time.perf_counter()
+    nb = run_notebook(str(notebook_path))
+    nb.metadata["build_hash"] = build_hash
+    with open(notebook_path, "w") as f:
+        nbformat.write(nb, f)
+    return time.perf_counter() - start_time
+
+
+def run_notebooks(pages: list[dict], jobs: int | None = None, force: bool = False) -> dict[str, tuple[str, float]]:
+    """Execute the notebooks of the pages in parallel, skipping those whose build hash is unchanged.
+
+    Returns the status ("ran" or "unchanged") and seconds per page name.
+    """
+    timings = {}
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        futures = {}
+        for page in pages:
+            notebook_path = NOTEBOOKS_DIR / f"{page['filename']}.ipynb"
+            start_time = time.perf_counter()
+            build_hash = get_build_hash(notebook_path, page.get("inputs", []))
+            if not force and nbformat.read(notebook_path, as_version=4).metadata.get("build_hash") == build_hash:
+                timings[page["name"]] = ("unchanged", time.perf_counter() - start_time)
+                print(f"Skipping {page['filename']}.ipynb, its code and inputs are unchanged")
+                continue
+            print(f"Running {page['filename']}.ipynb...")
+            futures[page["name"]] = executor.submit(execute_notebook, notebook_path, build_hash)
+
+        for name, future in futures.items():
+            timings[name] = ("ran", future.result())
+    return timings
+
+
 def extract_html_outputs(notebook_path: str, run: bool = False) -> list[str]:
     """Extract all HTML outputs from a notebook."""
     if run:
@@ -74,64 +196,96 @@ def convert_notebook_to_html(
     run: bool = False,
     current_page: str | None = None,
 ) -> None:
-    """Convert a notebook to HTML by extracting HTML outputs and wrapping in page template."""
+    """Convert a notebook to HTML by extracting HTML outputs and wrapping in page template.
+
+    Plotly.js is loaded once in the page head from plotly_url, or from the shared local asset, and only on
+    pages with plots or charts. The charts script is only loaded on pages with charts.
+    """
     html_outputs = extract_html_outputs(input_path, run=run)
     content = "\n".join(html_outputs)
 
-    if plotly_url:
-        content = strip_inline_plotly(content)
+    if not (uses_plotly(content) or uses_charts(content)):
+        plotly_url = None
+    elif not plotly_url:
+        plotly_url = write_asset(Path(output_path).parent, PLOTLY_ASSET, get_plotlyjs())
 
-    templates_dir = Path(__file__).parent / "templates"
-    env = Environment(loader=FileSystemLoader(templates_dir), autoescape=False)
-    template = env.get_template("page.html")
+    charts_url = None
+    if uses_charts(content):
+        charts_url = write_asset(Path(output_path).parent, CHARTS_ASSET, (TEMPLATES_DIR / CHARTS_ASSET).read_text())
 
-    html = template.render(
-        title=title,
-        content=content,
-        plotly_url=plotly_url,
-        pages=DEFAULT_PAGES,
-        current_page=current_page,
-    )
+    html = render_page(title, content, current_page, plotly_url, charts_url)
 
     with open(output_path, "w") as f:
         f.write(html)
 
 
+def _is_linked(path: Path, pages: str) -> bool:
+    """Whether a page links to the file, or loads files by URL from its directory like the bahnhof page."""
+    return path.as_posix() in pages or any(f'"{parent.as_posix()}"' in pages for parent in path.parents[:-1])
+
+
+def remove_unused_data_files(output_dir: Path) -> list[Path]:
+    """Remove the PNG images and JSON charts in data/ that no page links to anymore."""
+    pages = "\n".join(page.read_text() for page in output_dir.glob("*.html"))
+    data_dir = output_dir / "data"
+    unused = [
+        path
+        for path in sorted([*data_dir.rglob("*.png"), *data_dir.rglob("*.json")])
+        if not _is_linked(path.relative_to(output_dir), pages)
+    ]
+    for path in unused:
+        path.unlink()
+    return unused
+
+
 NOTEBOOKS_DIR = Path(__file__).parent.parent
-OUTPUT_DIR = Path(__file__).parent.parent.parent / "stats"
+REPO_DIR = NOTEBOOKS_DIR.parent
+OUTPUT_DIR = REPO_DIR / "stats"
 
 
 def convert_notebooks(
     pages: list[dict],
     plotly_url: str | None = None,
     run_pages: list[str] | None = None,
+    jobs: int | None = None,
+    force: bool = False,
 ) -> None:
     """Convert notebooks to HTML.
 
     Args:
         pages: List of page definitions to convert.
-        plotly_url: External Plotly.js URL (strips inline Plotly and loads from URL).
+        plotly_url: External Plotly.js URL (default: the shared local plotly.min.js asset).
         run_pages: List of page names to execute before extracting. None means don't run any.
+        jobs: Number of notebooks executed at the same time (default: number of CPUs).
+        force: Execute the run pages even if their code and inputs are unchanged.
     """
+    pages = [page for page in pages if page.get("notebook", True)]
+    timings = {}
+    if run_pages is not None:
+        timings = run_notebooks([page for page in pages if page["name"] in run_pages], jobs, force)
+
     for page in pages:
-        run = run_pages is not None and page["name"] in run_pages
-        if run:
-            print(f"Running {page['filename']}.ipynb...")
         input_path = NOTEBOOKS_DIR / f"{page['filename']}.ipynb"
         output_path = OUTPUT_DIR / f"{page['filename']}.html"
+        start_time = time.perf_counter()
         convert_notebook_to_html(
             str(input_path),
             str(output_path),
             title=page["display_name"],
             plotly_url=plotly_url,
-            run=run,
             current_page=page["name"],
         )
+        status, seconds = timings.get(page["name"], ("converted", 0.0))
+        print(f"{page['name']:<26} {status:<10} {seconds + time.perf_counter() - start_time:7.2f}s")
+
+    unused = remove_unused_data_files(OUTPUT_DIR)
+    if unused:
+        print(f"Removed {len(unused)} images and charts no page links to")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Convert notebook HTML outputs to HTML files")
-    parser.add_argument("--plotly-url", help="External Plotly.js URL (strips inline Plotly and loads from URL)")
+    parser.add_argument("--plotly-url", help=f"External Plotly.js URL (default: a shared local {PLOTLY_ASSET})")
     parser.add_argument(
         "--run",
         nargs="?",
@@ -140,17 +294,23 @@ if __name__ == "__main__":
         metavar="NOTEBOOK",
         help="Execute notebook(s) before extracting outputs. Without argument: run all. With argument: run specific notebook (e.g., 'allgemein')",
     )
+    parser.add_argument("--jobs", type=int, default=None, help="Notebooks executed in parallel (default: CPU count)")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Execute notebooks even if their code, src/ helpers and inputs are unchanged",
+    )
 
     args = parser.parse_args()
 
     run_pages = None
     if args.run is not None:
         if args.run == "all":
-            run_pages = [p["name"] for p in DEFAULT_PAGES]
+            run_pages = [p["name"] for p in DEFAULT_PAGES if p.get("notebook", True)]
         else:
-            valid_names = [p["name"] for p in DEFAULT_PAGES]
+            valid_names = [p["name"] for p in DEFAULT_PAGES if p.get("notebook", True)]
             if args.run not in valid_names:
                 parser.error(f"Unknown notebook '{args.run}'. Valid options: {valid_names}")
             run_pages = [args.run]
 
-    convert_notebooks(DEFAULT_PAGES, args.plotly_url, run_pages)
+    convert_notebooks(DEFAULT_PAGES, args.plotly_url, run_pages, args.jobs, args.force)
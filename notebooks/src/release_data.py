@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def get_release_files(months: int | None = 2, data_dir: Path | None = None) -> list[Path]:
+    """The monthly release files, only the last months if given."""
+    data_dir = Path(data_dir or "../monthly_processed_data")
+    files = sorted(data_dir.glob("data-*.parquet"))
+    return files[-months:] if months else files
+
+
+def get_cached_column(release_file: Path, column: str, cache_dir: Path) -> pa.ChunkedArray:
+    """One column of a release file from the Arrow IPC cache, memory-mapped instead of loaded into memory.
+
+    The cache file is written on first use and named after the size and modification time of the
+    release file, so a replaced release file is read again. String columns are dictionary encoded.
+    """
+    release_file = Path(release_file)
+    stat = release_file.stat()
+    cache_file = Path(cache_dir) / release_file.stem / f"{column}-{stat.st_size}-{stat.st_mtime_ns}.arrow"
+    if not cache_file.exists():
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        for stale_file in cache_file.parent.glob(f"{column}-*.arrow"):
+            stale_file.unlink()
+        field = pq.read_schema(release_file).field(column)
+        is_string = pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+        table = pq.read_table(release_file, columns=[column], read_dictionary=[column] if is_string else None)
+        # The IPC file format needs one dictionary for all batches
+        table = table.unify_dictionaries()
+        temp_file = cache_file.with_suffix(".tmp")
+        with pa.OSFile(str(temp_file), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        temp_file.rename(cache_file)
+    return pa.ipc.open_file(pa.memory_map(str(cache_file))).read_all().column(0)
+
+
+def get_release(
+    files: list[Path],
+    columns: list[str],
+    con: duckdb.DuckDBPyConnection | None = None,
+    cache_dir: Path | None = None,
+    use_cache: bool = True,
+) -> duckdb.DuckDBPyRelation:
+    """The release files as one DuckDB relation with only the given columns.
+
+    Filters, projections and aggregations on the relation run in DuckDB and are pushed into the scan,
+    so only their results are materialized when calling .df() or .arrow(). With use_cache, the columns
+    are scanned from memory-mapped Arrow IPC files in cache_dir that are reused by later notebook runs,
+    otherwise the parquet files are read directly.
+    """
+    con = con or duckdb.connect()
+    if not use_cache:
+        return con.read_parquet([str(file) for file in files]).select(*columns)
+
+    cache_dir = Path(cache_dir or "../monthly_processed_data/arrow_cache")
+    tables = [pa.table({column: get_cached_column(file, column, cache_dir) for column in columns}) for file in files]
+    return con.from_arrow(pa.concat_tables(tables))
@@ -0,0 +1,178 @@
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+from charts import get_chart
+from nb_to_html import (
+    CHARTS_ASSET,
+    DEFAULT_PAGES,
+    OUTPUT_DIR,
+    PLOTLY_ASSET,
+    REPO_DIR,
+    TEMPLATES_DIR,
+    get_jinja_env,
+    render_page,
+    write_asset,
+)
+from plotly.offline import get_plotlyjs
+from stats_cube import get_cube_files, get_month_range, get_stats
+
+STATION_PAGE = next(page for page in DEFAULT_PAGES if page["name"] == "bahnhof")
+# Per-station JSON files next to the page, loaded when a station is selected
+SHARD_DIR = "data/bahnhof"
+
+
+def _round(value, digits: int = 4):
+    return None if value is None or math.isnan(value) else round(float(value), digits)
+
+
+def _get_records_by_eva(table: pd.DataFrame) -> dict[str, list[dict]]:
+    """The rows of a table sorted by eva as dicts, grouped by eva."""
+    return {eva: list(rows) for eva, rows in groupby(table.to_dict("records"), key=itemgetter("eva"))}
+
+
+def get_station_tables(files: list[Path]) -> dict[str, pd.DataFrame]:
+    """Statistics of the cube per station, and per station and train type, hour and day."""
+    names = duckdb.sql(f"""
+        SELECT eva, coalesce(arg_max(station_name, date) FILTER (station_name IS NOT NULL), eva) AS station_name
+        FROM read_parquet({[str(file) for file in files]})
+        GROUP BY eva
+    """).df()
+    stations = get_stats(files, ["eva"]).merge(names, on="eva")
+    return {
+        "stations": stations.sort_values(["stops", "eva"], ascending=[False, True], ignore_index=True),
+        "train_types": get_stats(files, ["eva", "train_type"], "train_type IS NOT NULL"),
+        "hours": get_stats(files, ["eva", "hour"]),
+        "days": get_stats(files, ["eva", "strftime(date, '%Y-%m-%d') AS date"]),
+    }
+
+
+def get_station_shard(station: dict, train_types: list[dict], hours: list[dict], days: list[dict]) -> dict:
+    """The data of one station page: the overall statistics, a table per train type and the charts."""
+    train_types = sorted(train_types, key=itemgetter("stops"), reverse=True)
+    mean_delay_per_hour = pd.Series(
+        [row["mean_delay_in_min"] for row in hours], index=[f"{row['hour']:02d}:00" for row in hours]
+    )
+    punctuality_per_day = pd.Series([row["punctual_rate"] * 100 for row in days], index=[row["date"] for row in days])
+    return {
+        "eva": station["eva"],
+        "station_name": station["station_name"],
+        "stats": {
+            "stops": int(station["stops"]),
+            "mean_delay_in_min": _round(station["mean_delay_in_min"]),
+            "punctual_rate": _round(station["punctual_rate"]),
+            "canceled_rate": _round(station["canceled_rate"]),
+        },
+        "train_types": [
+            [
+                row["train_type"],
+                int(row["stops"]),
+                _round(row["mean_delay_in_min"]),
+                _round(row["punctual_rate"]),
+                _round(row["canceled_rate"]),
+            ]
+            for row in train_types
+        ],
+        "charts": [
+            get_chart(
+                "line",
+                {"Alle": mean_delay_per_hour},
+                title="Durchschnittliche Verspätung nach Uhrzeit",
+                x_label="Stunde",
+                y_label="Minuten",
+                markers=True,
+            ),
+            get_chart(
+                "line",
+                {"Alle": punctuality_per_day},
+                title="Pünktlichkeit (<6 min) pro Tag",
+                x_label="Tag",
+                y_label="Prozent (%)",
+                y_format="percent",
+                x_ticks=[day for day in punctuality_per_day.index if day.endswith(("-01", "-15"))],
+            ),
+        ],
+    }
+
+
+def write_station_shards(
+    shard_dir: Path, stations: pd.DataFrame, train_types: pd.DataFrame, hours: pd.DataFrame, days: pd.DataFrame
+) -> int:
+    """Write the JSON file of each station, the tables only contain the rows of these stations sorted by eva."""
+    train_types_by_eva = _get_records_by_eva(train_types)
+    hours_by_eva = _get_records_by_eva(hours)
+    days_by_eva = _get_records_by_eva(days)
+    for station in stations.to_dict("records"):
+        eva = station["eva"]
+        shard = get_station_shard(station, train_types_by_eva.get(eva, []), hours_by_eva[eva], days_by_eva[eva])
+        (shard_dir / f"{eva}.json").write_text(json.dumps(shard, ensure_ascii=False, separators=(",", ":")))
+    return len(stations)
+
+
+def build_station_page(
+    files: list[Path], output_dir: Path = OUTPUT_DIR, jobs: int | None = None, plotly_url: str | None = None
+) -> int:
+    """Write the station page and the JSON files of all stations, and return the number of stations.
+
+    The stations are split into chunks that are written in parallel. Files of stations that are no longer in
+    the cube are removed. The charts are drawn with Plotly.js from plotly_url or the shared local asset.
+    """
+    output_dir = Path(output_dir)
+    shard_dir = output_dir / SHARD_DIR
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    tables = get_station_tables(files)
+    stations = tables["stations"]
+
+    jobs = jobs or os.cpu_count()
+    chunks = [chunk for chunk in np.array_split(stations["eva"].to_numpy(), jobs * 4) if len(chunk)]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                write_station_shards,
+                shard_dir,
+                *[
+                    tables[name][tables[name]["eva"].isin(chunk)]
+                    for name in ["stations", "train_types", "hours", "days"]
+                ],
+            )
+            for chunk in chunks
+        ]
+        station_count = sum(future.result() for future in futures)
+
+    station_files = {f"{eva}.json" for eva in stations["eva"]} | {"index.json"}
+    for shard_file in shard_dir.glob("*.json"):
+        if shard_file.name not in station_files:
+            shard_file.unlink()
+    index = stations[["eva", "station_name"]].values.tolist()
+    (shard_dir / "index.json").write_text(json.dumps(index, ensure_ascii=False, separators=(",", ":")))
+
+    start_month, end_month = get_month_range(files)
+    template = get_jinja_env().get_template("station_page.html")
+    content = template.render(shard_url=SHARD_DIR, start_month=start_month, end_month=end_month)
+    plotly_url = plotly_url or write_asset(output_dir, PLOTLY_ASSET, get_plotlyjs())
+    charts_url = write_asset(output_dir, CHARTS_ASSET, (TEMPLATES_DIR / CHARTS_ASSET).read_text())
+    html = render_page(STATION_PAGE["display_name"], content, STATION_PAGE["name"], plotly_url, charts_url)
+    (output_dir / f"{STATION_PAGE['filename']}.html").write_text(html)
+    return station_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the station page and its per-station data from the cube")
+    parser.add_argument("--months", type=int, default=2, help="Number of last months in the statistics")
+    parser.add_argument("--jobs", type=int, default=None, help="Processes writing station files (default: CPU count)")
+    parser.add_argument("--plotly-url", help=f"External Plotly.js URL (default: a shared local {PLOTLY_ASSET})")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    files = get_cube_files(args.months, cube_dir=REPO_DIR / "monthly_processed_data" / "stats_cube")
+    station_count = build_station_page(files, OUTPUT_DIR, args.jobs, args.plotly_url)
+    print(f"Built the station page with {station_count} stations in {time.perf_counter() - start_time:.1f}s")
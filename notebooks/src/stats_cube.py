@@ -0,0 +1,143 @@
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+TRAIN_TYPES = ["ICE", "IC", "RE", "RB", "S"]
+MEASURES = ["stops", "canceled_stops", "delay_sum_in_min", "punctual_stops"]
+
+
+def get_cube_files(months: int | None = None, kind: str = "cube", cube_dir: Path | None = None) -> list[Path]:
+    """The monthly statistics cube files (kind "cube" or "trains"), only the last months if given."""
+    cube_dir = Path(cube_dir or "../monthly_processed_data/stats_cube")
+    files = sorted(cube_dir.glob(f"{kind}-*.parquet"))
+    return files[-months:] if months else files
+
+
+def get_stats(files: list[Path], by: list[str] = (), where: str = "true") -> pd.DataFrame:
+    """Summed counts, cancellation rate, mean delay and punctuality per group of the cube, sorted by the groups.
+
+    by are cube columns or SQL expressions like "isodow(date) AS weekday", without by everything is one
+    group. Mean delay and punctuality (less than 6 minutes delay) only count stops that were not canceled.
+    """
+    return duckdb.sql(f"""
+        SELECT
+            {"".join(f"{column}, " for column in by)}
+            CAST(sum(stops) AS BIGINT) AS stops,
+            CAST(sum(canceled_stops) AS BIGINT) AS canceled_stops,
+            CAST(sum(stops) - sum(canceled_stops) AS BIGINT) AS not_canceled_stops,
+            CAST(sum(delay_sum_in_min) AS BIGINT) AS delay_sum_in_min,
+            CAST(sum(punctual_stops) AS BIGINT) AS punctual_stops,
+            sum(canceled_stops) / sum(stops) AS canceled_rate,
+            sum(delay_sum_in_min) / nullif(sum(stops) - sum(canceled_stops), 0) AS mean_delay_in_min,
+            sum(punctual_stops) / nullif(sum(stops) - sum(canceled_stops), 0) AS punctual_rate
+        FROM read_parquet({[str(file) for file in files]})
+        WHERE {where}
+        GROUP BY ALL
+        ORDER BY ALL
+    """).df()
+
+
+def _add_rates(stats: pd.DataFrame) -> pd.DataFrame:
+    """Add the rates of get_stats to summed measures."""
+    not_canceled_stops = stats["stops"] - stats["canceled_stops"]
+    stats.insert(stats.columns.get_loc("delay_sum_in_min"), "not_canceled_stops", not_canceled_stops)
+    stats["canceled_rate"] = stats["canceled_stops"] / stats["stops"]
+    stats["mean_delay_in_min"] = stats["delay_sum_in_min"] / not_canceled_stops.where(not_canceled_stops != 0)
+    stats["punctual_rate"] = stats["punctual_stops"] / not_canceled_stops.where(not_canceled_stops != 0)
+    return stats
+
+
+def _get_train_type_codes(train_type: pd.Series, train_types: list[str]) -> np.ndarray:
+    """Position of each train type in train_types, other and missing types get len(train_types)."""
+    codes = pd.Index(train_types).get_indexer(train_type)
+    codes[codes < 0] = len(train_types)
+    return codes
+
+
+def get_stats_per_train_type(
+    files: list[Path], by: list[str] = (), where: str = "true", train_types: list[str] = TRAIN_TYPES
+) -> dict[str, pd.DataFrame]:
+    """get_stats of all stops ("Alle") and of each of the train types, from one grouped pass over the cube.
+
+    The cube is summed per group and train type in DuckDB. The groups and train types of the sums become
+    categorical codes, and every table is a np.bincount of the sums over these codes. Like with get_stats,
+    groups without stops of a train type are missing from its table.
+    """
+    sums = duckdb.sql(f"""
+        SELECT {"".join(f"{column}, " for column in by)} train_type, {", ".join(f"sum({m}) AS {m}" for m in MEASURES)}
+        FROM read_parquet({[str(file) for file in files]})
+        WHERE {where}
+        GROUP BY ALL
+    """).df()
+    group_columns = list(sums.columns[: len(by)])
+
+    # Without groups all sums belong to one group, NULL is a group like in get_stats
+    group_codes, groups = np.zeros(len(sums), dtype=np.int64), None
+    if group_columns:
+        group_codes, groups = pd.MultiIndex.from_frame(sums[group_columns]).factorize(use_na_sentinel=False)
+    group_count = len(groups) if group_columns else 1
+    codes = _get_train_type_codes(sums["train_type"], train_types) * group_count + group_codes
+
+    measures = {}
+    for measure in MEASURES:
+        weights = sums[measure].to_numpy(dtype=np.float64)
+        per_type = np.bincount(codes, weights, minlength=(len(train_types) + 1) * group_count)
+        measures[measure] = per_type.reshape(len(train_types) + 1, group_count).astype(np.int64)
+
+    tables = {}
+    for name, row in [("Alle", None), *[(train_type, i) for i, train_type in enumerate(train_types)]]:
+        stats = pd.DataFrame({m: values.sum(axis=0) if row is None else values[row] for m, values in measures.items()})
+        stats = _add_rates(stats)
+        if group_columns:
+            stats = pd.concat([groups.to_frame(index=False, name=group_columns), stats], axis=1)
+            stats = stats[stats["stops"] > 0].sort_values(group_columns, ignore_index=True)
+        tables[name] = stats
+    return tables
+
+
+def get_delay_distribution(files: list[Path], where: str = "true") -> pd.Series:
+    """Number of stops that were not canceled per delay in minutes, merged from the cube histograms."""
+    distribution = duckdb.sql(f"""
+        SELECT delay_in_min, sum(stops) AS stops
+        FROM (
+            SELECT unnest(delay_histogram, recursive := true)
+            FROM read_parquet({[str(file) for file in files]})
+            WHERE {where}
+        )
+        GROUP BY delay_in_min
+        ORDER BY delay_in_min
+    """).df()
+    return distribution.set_index("delay_in_min")["stops"].astype("int64")
+
+
+def get_delay_distributions(
+    files: list[Path], where: str = "true", train_types: list[str] = TRAIN_TYPES
+) -> dict[str, pd.Series]:
+    """get_delay_distribution of all stops ("Alle") and of each of the train types, from one pass over the cube."""
+    sums = duckdb.sql(f"""
+        SELECT train_type, delay_in_min, sum(stops) AS stops
+        FROM (
+            SELECT train_type, unnest(delay_histogram, recursive := true)
+            FROM read_parquet({[str(file) for file in files]})
+            WHERE {where}
+        )
+        GROUP BY ALL
+    """).df()
+    delay_codes, delays = pd.factorize(sums["delay_in_min"], sort=True)
+    codes = _get_train_type_codes(sums["train_type"], train_types) * len(delays) + delay_codes
+    per_type = np.bincount(codes, sums["stops"].to_numpy(dtype=np.float64), (len(train_types) + 1) * len(delays))
+    per_type = per_type.reshape(len(train_types) + 1, len(delays)).astype(np.int64)
+
+    distributions = {}
+    for name, stops in [("Alle", per_type.sum(axis=0)), *zip(train_types, per_type[:-1], strict=True)]:
+        distribution = pd.Series(stops, index=pd.Index(delays, name="delay_in_min"), name="stops")
+        distributions[name] = distribution[distribution > 0]
+    return distributions
+
+
+def get_month_range(files: list[Path]) -> tuple[str, str]:
+    """First and last month of the cube files, e.g. ("2025-06", "2025-07")."""
+    months = [file.stem.split("-", 1)[1] for file in files]
+    return months[0], months[-1]
@@ -0,0 +1,23 @@
+// Draws the Plotly figure JSON files of notebooks/src/charts.py into every <div class="chart" data-src="...">.
+// Plotly.js itself is loaded once by the page.
+(function () {
+    const CONFIG = { responsive: true, displaylogo: false };
+
+    function render(container, figure) {
+        return Plotly.newPlot(container, figure.data, figure.layout, CONFIG);
+    }
+
+    // Pages that load chart data themselves draw it with renderChart(container, figure)
+    window.renderChart = render;
+
+    document.addEventListener("DOMContentLoaded", () => {
+        for (const container of document.querySelectorAll(".chart[data-src]")) {
+            fetch(container.dataset.src)
+                .then(response => response.json())
+                .then(figure => render(container, figure))
+                .catch(error => {
+                    container.textContent = `Diagramm konnte nicht geladen werden: ${error}`;
+                });
+        }
+    });
+})();
@@ -1,9 +1,10 @@
+import json
+from functools import cache
 from pathlib import Path
 
 import pandas as pd
 import plotly.graph_objects as go
-from htpy import Element, h1, h2, h3, p, tbody, td, th, thead, tr
-from htpy import table as htpy_table
+from htpy import h1, h2, h3, p
 from jinja2 import Environment, FileSystemLoader
 from markupsafe import Markup
 
@@ -17,6 +18,7 @@ def _get_id(element_type: str) -> int:
     return id_value
 
 
+@cache
 def _get_jinja_env() -> Environment:
     return Environment(loader=FileSystemLoader(_templates_dir), autoescape=False)
 
@@ -26,14 +28,10 @@ def _to_str(html) -> str:
     return "".join([str(html)])
 
 
-def _generate_table_element(df: pd.DataFrame, table_id: int) -> Element:
-    headers = list(df.columns)
-
-    header_row = tr[[th(onclick=f"sortTable_{table_id}({i})")[f"{col} \u21d5"] for i, col in enumerate(headers)]]
-
-    body_rows = [tr[[td[str(cell)] for cell in row]] for row in df.values]
-
-    return htpy_table(id=f"sortableTable_{table_id}")[thead[header_row], tbody[body_rows]]
+def _get_table_json(df: pd.DataFrame) -> str:
+    """The cell texts as one JSON list per column, safe to embed in a script tag."""
+    columns = [[str(cell) for cell in column] for column in df.values.T]
+    return json.dumps(columns, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
 
 
 def table(pandas_table: pd.DataFrame) -> str:
@@ -41,10 +39,10 @@ def table(pandas_table: pd.DataFrame) -> str:
     template = env.get_template("table_div.html")
 
     table_id = _get_id("table")
-    headers = list(pandas_table.columns)
-    table_html = _to_str(_generate_table_element(pandas_table, table_id))
+    headers = [str(header) for header in pandas_table.columns]
+    table_json = _get_table_json(pandas_table)
 
-    return template.render(headers=headers, table_html=table_html, table_id=table_id)
+    return template.render(headers=headers, table_json=table_json, table_id=table_id)
 
 
 def buttons(tabs: dict[str, str]) -> str:
@@ -59,7 +57,8 @@ def buttons(tabs: dict[str, str]) -> str:
 
 
 def plot(fig: go.Figure) -> str:
-    return fig.to_html(full_html=False, include_plotlyjs=True)
+    """The figure JSON and the call that draws it, Plotly.js itself is loaded once by the page."""
+    return fig.to_html(full_html=False, include_plotlyjs=False)
 
 
 def heading(text: str, level: int = 1) -> str:
@@ -85,6 +84,11 @@ def image(src: str, alt: str = "") -> str:
     return f'<img src="{src}" alt="{alt}" style="width: 100%; max-width: 100%;">'
 
 
+def chart(src: str, alt: str = "") -> str:
+    """Placeholder that the shared charts.js fills with the chart of a JSON file written by charts.write_chart."""
+    return f'<div class="chart" data-src="{src}" role="img" aria-label="{alt}" style="aspect-ratio: 16 / 9;"></div>'
+
+
 def dropdown(options: dict[str, str], default: str | None = None) -> str:
     env = _get_jinja_env()
     template = env.get_template("dropdown.html")
@@ -0,0 +1,169 @@
+import argparse
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+STOP_COLUMNS = [
+    "eva",
+    "train_line_ride_id",
+    "train_type",
+    "arrival_planned_time",
+    "arrival_change_time",
+    "departure_planned_time",
+    "departure_change_time",
+    "is_canceled",
+]
+
+# Stations whose stops are read and held in memory at the same time
+STATIONS_PER_QUERY = 100
+
+RESULT_COLUMNS = [
+    "eva",
+    "station_name",
+    "arrival_train_type",
+    "departure_train_type",
+    "planned_connections",
+    "broken_connections",
+    "broken_share",
+]
+
+
+def get_station_connections(
+    stops: pd.DataFrame, min_transfer_in_min: int = 2, max_transfer_in_min: int = 15
+) -> pd.DataFrame:
+    """Match every arrival at a station with the departures of other rides in its planned transfer window.
+
+    Departures are sorted once by planned time, then the window of every arrival is found with a binary
+    search, so the cost grows with the number of connections instead of arrivals times departures.
+    A connection is broken if one of the stops is canceled or the actual transfer time is below
+    min_transfer_in_min.
+    """
+    arrivals = stops[stops["arrival_planned_time"].notna()].sort_values("arrival_planned_time")
+    departures = stops[stops["departure_planned_time"].notna()].sort_values("departure_planned_time")
+
+    arrival_times = arrivals["arrival_planned_time"].to_numpy()
+    departure_times = departures["departure_planned_time"].to_numpy()
+    window_start = np.searchsorted(departure_times, arrival_times + np.timedelta64(min_transfer_in_min, "m"), "left")
+    window_end = np.searchsorted(departure_times, arrival_times + np.timedelta64(max_transfer_in_min, "m"), "right")
+
+    # Expand the windows into (arrival, departure) index pairs
+    counts = window_end - window_start
+    arrival_idx = np.repeat(np.arange(len(arrivals)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    departure_idx = np.repeat(window_start, counts) + offsets
+
+    arrival_ride = arrivals["train_line_ride_id"].to_numpy()[arrival_idx]
+    departure_ride = departures["train_line_ride_id"].to_numpy()[departure_idx]
+    # Staying on the same train is not a transfer
+    is_transfer = arrival_ride != departure_ride
+    arrival_idx, departure_idx = arrival_idx[is_transfer], departure_idx[is_transfer]
+
+    actual_transfer = (
+        departures["departure_change_time"].to_numpy()[departure_idx]
+        - arrivals["arrival_change_time"].to_numpy()[arrival_idx]
+    ) / np.timedelta64(1, "m")
+    is_broken = (
+        arrivals["is_canceled"].to_numpy()[arrival_idx]
+        | departures["is_canceled"].to_numpy()[departure_idx]
+        | (actual_transfer < min_transfer_in_min)
+    )
+
+    return pd.DataFrame(
+        {
+            "arrival_train_type": arrivals["train_type"].to_numpy()[arrival_idx],
+            "departure_train_type": departures["train_type"].to_numpy()[departure_idx],
+            "planned_transfer_in_min": (
+                (departure_times[departure_idx] - arrival_times[arrival_idx]) / np.timedelta64(1, "m")
+            ).astype("int32"),
+            "actual_transfer_in_min": actual_transfer,
+            "is_broken": is_broken,
+        }
+    )
+
+
+def analyze_transfers(
+    release_file: Path,
+    min_transfer_in_min: int = 2,
+    max_transfer_in_min: int = 15,
+    evas: list[str] | None = None,
+    stations_per_query: int = STATIONS_PER_QUERY,
+) -> pd.DataFrame:
+    """Count the planned and broken connections per station and train type pair of a monthly release.
+
+    Stations are identified by eva and named by their latest station name, which can change within a month.
+    The stops are read for stations_per_query stations at a time, so only their stops are held in memory.
+    """
+    eva_filter = ""
+    if evas:
+        eva_filter = f"WHERE eva IN ({', '.join('?' for _ in evas)})"
+    stations = duckdb.execute(
+        f"""
+        SELECT eva, arg_max(station_name, time) AS station_name
+        FROM '{release_file}'
+        {eva_filter}
+        GROUP BY eva
+        ORDER BY eva
+        """,
+        evas or [],
+    ).df()
+
+    results = []
+    for start in range(0, len(stations), stations_per_query):
+        batch = stations.iloc[start : start + stations_per_query]
+        stops = duckdb.execute(
+            f"SELECT {', '.join(STOP_COLUMNS)} FROM '{release_file}' WHERE list_contains(?, eva) ORDER BY eva",
+            [batch["eva"].tolist()],
+        ).df()
+        station_names = dict(zip(batch["eva"], batch["station_name"]))
+        for eva, station_stops in stops.groupby("eva", sort=False):
+            connections = get_station_connections(station_stops, min_transfer_in_min, max_transfer_in_min)
+            counts = (
+                connections.groupby(["arrival_train_type", "departure_train_type"], dropna=False)["is_broken"]
+                .agg(planned_connections="size", broken_connections="sum")
+                .reset_index()
+            )
+            counts.insert(0, "station_name", station_names[eva])
+            counts.insert(0, "eva", eva)
+            results.append(counts)
+
+    if not results:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    result = pd.concat(results, ignore_index=True)
+    result["broken_share"] = result["broken_connections"] / result["planned_connections"]
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count the connections at stations broken by delays")
+    parser.add_argument(
+        "release_file", type=Path, help="Monthly release file, e.g. monthly_processed_data/data-2025-07.parquet"
+    )
+    parser.add_argument("--min-transfer", type=int, default=2, help="Minimum transfer time in minutes")
+    parser.add_argument("--max-transfer", type=int, default=15, help="Maximum planned transfer time in minutes")
+    parser.add_argument("--eva", nargs="+", default=None, help="Only analyze these stations (default: all)")
+    parser.add_argument(
+        "--stations-per-query",
+        type=int,
+        default=STATIONS_PER_QUERY,
+        help="Stations whose stops are held in memory at the same time",
+    )
+    parser.add_argument("--output", type=Path, default=None, help="Write the result to this parquet file")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    result = analyze_transfers(
+        args.release_file, args.min_transfer, args.max_transfer, args.eva, args.stations_per_query
+    )
+    print(f"Analyzed {result['eva'].nunique():_} stations in {time.time() - start_time:.2f} seconds")
+    if args.eva:
+        for (eva, station_name), station in result.groupby(["eva", "station_name"], sort=False):
+            print(f"{station_name} ({eva}): {station['planned_connections'].sum():_} connections")
+
+    if args.output:
+        result.to_parquet(args.output, index=False)
+        print(f"Saved transfers to {args.output}")
+    else:
+        print(result.sort_values("planned_connections", ascending=False).head(30).to_string(index=False))
@@ -0,0 +1,117 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+from create_monthly_data_release import ReleaseLayout
+
+LAYOUTS = {
+    "default": ReleaseLayout(),
+    "optimized": ReleaseLayout(
+        row_group_size=65_536,
+        compression_level=9,
+        bloom_filter_fpp=0.01,
+        sort_by=("time", "eva"),
+    ),
+    # Stations clustered within each day, so station lookups can skip most row groups of a day
+    "optimized_day_eva": ReleaseLayout(
+        row_group_size=65_536,
+        compression_level=9,
+        bloom_filter_fpp=0.01,
+        sort_by=("date_trunc('day', time)", "eva", "time"),
+    ),
+}
+
+
+def create_synthetic_release(con: duckdb.DuckDBPyConnection, num_rows: int):
+    """Create a release-like table with about 15 stops per ride over one month and a few thousand stations."""
+    con.execute(f"""
+        CREATE TABLE release AS
+        SELECT
+            'Station ' || (hash(i // 15) % 5000 + i % 15) % 5000 AS station_name,
+            'Station ' || (hash(i // 15) % 5000 + i % 15) % 5000 AS xml_station_name,
+            lpad(CAST(8000000 + (hash(i // 15) % 5000 + i % 15) % 5000 AS VARCHAR), 8, '0') AS eva,
+            CAST(hash(i // 15) % 30000 AS VARCHAR) AS train_number,
+            NULL::VARCHAR AS line_number,
+            'Station ' || hash(i // 15) % 5000 AS final_destination_station,
+            CAST(hash(i) % 20 AS INTEGER) AS delay_in_min,
+            TIMESTAMP '2025-01-01' + to_minutes(CAST((i // 15) * 44640 // {num_rows // 15} + (i % 15) * 7 AS BIGINT))
+                AS time,
+            hash(i) % 50 = 0 AS is_canceled,
+            ['ICE', 'IC', 'RE', 'RB', 'S'][CAST(hash(i // 15) % 5 + 1 AS BIGINT)] AS train_type,
+            CAST(hash(i // 15) AS VARCHAR) AS train_line_ride_id,
+            CAST(i % 15 + 1 AS INTEGER) AS train_line_station_num,
+            time AS arrival_planned_time,
+            time AS arrival_change_time,
+            time AS departure_planned_time,
+            time AS departure_change_time,
+            train_line_ride_id || '-2501010000-' || train_line_station_num AS id
+        FROM range({num_rows}) t(i)
+    """)
+
+
+def time_query(query: str, repeat: int) -> float:
+    """Median time of a query, each run on a fresh connection so no metadata is cached."""
+    timings = []
+    for _ in range(repeat):
+        con = duckdb.connect()
+        start_time = time.perf_counter()
+        con.execute(query).fetchall()
+        timings.append(time.perf_counter() - start_time)
+        con.close()
+    return sorted(timings)[len(timings) // 2]
+
+
+def main(parquet_file: Path | None, num_rows: int, repeat: int):
+    con = duckdb.connect()
+    if parquet_file is None:
+        create_synthetic_release(con, num_rows)
+        print(f"Benchmarking a synthetic release with {num_rows:_} rows")
+    else:
+        con.execute(f"CREATE TABLE release AS SELECT * FROM '{parquet_file}'")
+        print(f"Benchmarking {parquet_file}")
+
+    eva, train_number, ride_id = con.execute(
+        "SELECT eva, train_number, train_line_ride_id FROM release USING SAMPLE 1 ROWS (reservoir, 42)"
+    ).fetchone()
+    lookups = {
+        "station (eva)": f"eva = '{eva}'",
+        "station for one day": f"eva = '{eva}' AND time >= TIMESTAMP '2025-01-10' AND time < TIMESTAMP '2025-01-11'",
+        "train_number": f"train_number = '{train_number}'",
+        "train_line_ride_id": f"train_line_ride_id = '{ride_id}'",
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, layout in LAYOUTS.items():
+            output_file = Path(temp_dir) / f"{name}.parquet"
+            start_time = time.perf_counter()
+            con.execute(
+                f"COPY (SELECT * FROM release ORDER BY {', '.join(layout.sort_by)}) "
+                f"TO '{output_file}' ({layout.copy_options()})"
+            )
+            write_time = time.perf_counter() - start_time
+
+            row_groups, bloom_columns = con.execute(f"""
+                SELECT
+                    count(DISTINCT row_group_id),
+                    list_sort(list(DISTINCT path_in_schema) FILTER (bloom_filter_offset IS NOT NULL))
+                FROM parquet_metadata('{output_file}')
+            """).fetchone()
+            print(
+                f"\n{name}: {output_file.stat().st_size / 1e6:.1f} MB, {row_groups} row groups, written in {write_time:.2f}s"
+            )
+            print(f"  bloom filters: {', '.join(bloom_columns)}")
+            for lookup_name, predicate in lookups.items():
+                seconds = time_query(f"SELECT * FROM '{output_file}' WHERE {predicate}", repeat)
+                print(f"  {lookup_name:<22} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark station and train lookups on different release layouts")
+    parser.add_argument("parquet_file", nargs="?", type=Path, default=None, help="Monthly release (default: synthetic)")
+    parser.add_argument("--rows", type=int, default=5_000_000, help="Rows of the synthetic release")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    main(args.parquet_file, args.rows, args.repeat)
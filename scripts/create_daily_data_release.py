@@ -0,0 +1,148 @@
+import argparse
+import json
+import shutil
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from create_monthly_data_release import (
+    get_duckdb_connection,
+    get_release_query,
+    process_files_to_temp,
+    register_station_names,
+)
+
+# Typed empty fchg source for windows without any change snapshots
+EMPTY_FCHG_SOURCE = """(
+    SELECT
+        NULL::VARCHAR AS id,
+        NULL::TIMESTAMP AS arrival_change_time,
+        NULL::TIMESTAMP AS departure_change_time,
+        NULL::BOOLEAN AS is_canceled,
+        NULL::TIMESTAMP AS xml_timestamp
+    WHERE false
+)"""
+
+
+def get_day_parquet_files(day: date) -> list[Path]:
+    """Get all raw parquet files fetched on the given day."""
+    return sorted(Path(f"raw_data/year={day.year}/month={day.month}/day={day.day}").rglob("*.parquet"))
+
+
+def get_snapshot_file(output_dir: Path, kind: str, day: date) -> Path:
+    return Path(output_dir) / "snapshots" / kind / f"date={day.isoformat()}.parquet"
+
+
+def get_daily_release_query(month_dir: Path) -> str:
+    """Query resolving the daily deltas of one month into the current rows, the newest delta winning per id."""
+    return f"""
+        SELECT * EXCLUDE (filename) FROM (
+            SELECT DISTINCT ON (id) *
+            FROM read_parquet('{Path(month_dir) / "delta-*.parquet"}', filename = true)
+            ORDER BY id, filename DESC
+        )
+        ORDER BY time
+    """
+
+
+def main(day: date, parquet_files: list[Path], eva_to_station: dict, output_dir: Path, cache_dir: Path | None = None):
+    """Upsert the raw files of one day into the daily processed data.
+
+    The latest plan and fchg snapshot per stop id of the day is kept in small snapshot files. Every
+    stop seen on this day is then merged with the snapshots of the neighbouring days (stop ids only
+    span about a day) and written as a delta file into the month of its time, so the cost only depends
+    on the volume of this day and the month is never rewritten.
+    """
+    start_time = time.time()
+
+    output_dir = Path(output_dir)
+    temp_dir = output_dir / f"temp_daily_processing_{day.isoformat()}"
+    total_xml_count, total_plan_count, total_fchg_count = process_files_to_temp(parquet_files, temp_dir, cache_dir)
+
+    print(f"There are {total_xml_count:_} valid .xml strings")
+    print(f"Containing {total_plan_count:_} planed schedules")
+    print(f"Containing {total_fchg_count:_} change schedules")
+
+    con = get_duckdb_connection(temp_directory=temp_dir / "duckdb_spill")
+    register_station_names(con, eva_to_station)
+
+    # Keep the latest snapshot per id of this day, replacing the snapshot of an earlier run of the same day
+    for kind, count in [("plan", total_plan_count), ("fchg", total_fchg_count)]:
+        snapshot_file = get_snapshot_file(output_dir, kind, day)
+        snapshot_file.unlink(missing_ok=True)
+        if count == 0:
+            continue
+        snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        con.execute(f"""
+            COPY (
+                SELECT DISTINCT ON (id) *
+                FROM '{temp_dir / kind / "*.parquet"}'
+                ORDER BY id, xml_timestamp DESC
+            ) TO '{snapshot_file}' (FORMAT PARQUET)
+        """)
+
+    day_snapshots = [get_snapshot_file(output_dir, kind, day) for kind in ["plan", "fchg"]]
+    day_snapshots = [str(f) for f in day_snapshots if f.exists()]
+    if not day_snapshots:
+        print(f"No stops found for {day.isoformat()}")
+        con.close()
+        shutil.rmtree(temp_dir)
+        return
+
+    con.execute(
+        f"CREATE TEMP TABLE affected AS SELECT DISTINCT id FROM read_parquet({day_snapshots}, union_by_name = true)"
+    )
+
+    # Merge the affected stops with the snapshots of the neighbouring days
+    window = [day + timedelta(days=offset) for offset in (-1, 0, 1)]
+    sources = {}
+    for kind in ["plan", "fchg"]:
+        files = [str(get_snapshot_file(output_dir, kind, d)) for d in window]
+        files = [f for f in files if Path(f).exists()]
+        sources[kind] = (
+            f"(SELECT * FROM read_parquet({files}, union_by_name = true) WHERE id IN (SELECT id FROM affected))"
+            if files
+            else None
+        )
+
+    if sources["plan"] is None:
+        print(f"No planned stops found around {day.isoformat()}")
+        con.close()
+        shutil.rmtree(temp_dir)
+        return
+
+    con.execute(f"""
+        CREATE TEMP TABLE delta AS
+        {get_release_query(sources["plan"], sources["fchg"] or EMPTY_FCHG_SOURCE)}
+    """)
+
+    # Write one delta file per month the stops of this day fall into
+    months = con.execute("SELECT DISTINCT strftime(time, '%Y-%m') FROM delta WHERE time IS NOT NULL").fetchall()
+    for (month,) in months:
+        month_dir = output_dir / f"month={month}"
+        month_dir.mkdir(parents=True, exist_ok=True)
+        delta_file = month_dir / f"delta-{day.isoformat()}.parquet"
+        con.execute(f"""
+            COPY (
+                SELECT * FROM delta WHERE strftime(time, '%Y-%m') = '{month}' ORDER BY time
+            ) TO '{delta_file}' (FORMAT PARQUET)
+        """)
+        print(f"Saved records to {delta_file}")
+
+    con.close()
+    shutil.rmtree(temp_dir)
+    print(f"Total processing time: {time.time() - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upsert the raw data of one day into the daily processed data")
+    parser.add_argument("date", help="Day the raw data was fetched, YYYY-MM-DD")
+    parser.add_argument("--output-dir", type=Path, default=Path("daily_processed_data"))
+    parser.add_argument(
+        "--cache-dir", type=Path, default=None, help="Reuse parsed plan/fchg batches of unchanged raw files from here"
+    )
+    args = parser.parse_args()
+
+    day = datetime.strptime(args.date, "%Y-%m-%d").date()
+    eva_to_station = json.load(open("config/eva_to_station_name.json"))
+    main(day, get_day_parquet_files(day), eva_to_station, output_dir=args.output_dir, cache_dir=args.cache_dir)
@@ -1,8 +1,11 @@
+import argparse
+import hashlib
 import json
+import os
 import shutil
-import sys
 import time
 from calendar import monthrange
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
@@ -10,6 +13,18 @@ import duckdb
 import pandas as pd
 from lxml import etree
 
+# Bump whenever the parsed plan/fchg schema changes, so stale parse cache entries are not reused
+PARSE_CACHE_VERSION = 3
+
+# Number of files the station partitioned export splits a month into
+STATION_BUCKETS = 64
+
+# 2^10 HyperLogLog registers per sketch, about 3% standard error for distinct ride counts
+HLL_PRECISION = 10
+
+# First collected month, the daily prefix sums count from here
+FIRST_MONTH = (2024, 7)
+
 
 def to_datetime(datetime_str: str):
     if datetime_str is None:
@@ -17,7 +32,7 @@ def to_datetime(datetime_str: str):
     return pd.to_datetime(datetime_str, format="%y%m%d%H%M", errors="coerce")
 
 
-def get_plan_xml_rows(xml_string: str, eva: str, station_name: dict[str, str], xml_timestamp) -> list[dict]:
+def get_plan_xml_rows(xml_string: str, eva: str, xml_timestamp) -> list[dict]:
     root = etree.fromstring(xml_string.encode())
     xml_station_name = root.get("station")
 
@@ -33,11 +48,11 @@ def get_plan_xml_rows(xml_string: str, eva: str, station_name: dict[str, str], x
         dp_line = s.find("dp").get("l") if s.find("dp") is not None else None
         line_number = ar_line if ar_line is not None else dp_line
 
-        dp_ppth = s.find("dp").get("ppth") if s.find("dp") is not None else None  # departure planned path
-        if dp_ppth is None:
-            final_destination_station = station_name
-        else:
-            final_destination_station = dp_ppth.split("|")[-1]
+        # departure planned path; without it the train ends here, which is resolved to the station name in DuckDB
+        dp_ppth = s.find("dp").get("ppth") if s.find("dp") is not None else None
+        # arrival planned path, the stations before this one
+        ar_ppth = s.find("ar").get("ppth") if s.find("ar") is not None else None
+        final_destination_station = dp_ppth.split("|")[-1] if dp_ppth is not None else None
 
         ar_pt = s.find("ar").get("pt") if s.find("ar") is not None else None
         dp_pt = s.find("dp").get("pt") if s.find("dp") is not None else None
@@ -45,7 +60,6 @@ def get_plan_xml_rows(xml_string: str, eva: str, station_name: dict[str, str], x
         rows.append(
             {
                 "id": s_id,
-                "station_name": station_name,
                 "xml_station_name": xml_station_name,
                 "eva": eva,
                 "train_number": train_number,
@@ -54,20 +68,22 @@ def get_plan_xml_rows(xml_string: str, eva: str, station_name: dict[str, str], x
                 "train_type": train_type,
                 "arrival_planned_time": to_datetime(ar_pt),
                 "departure_planned_time": to_datetime(dp_pt),
+                "arrival_planned_path": ar_ppth,
+                "departure_planned_path": dp_ppth,
                 "xml_timestamp": xml_timestamp,
             }
         )
     return rows
 
 
-def get_plan_db(xml_df, eva_to_station):
+def get_plan_db(xml_df):
     raw_plan_df = xml_df[(xml_df["api_name"] == "timetables/v1/plan")]
     rows = []
     for row in raw_plan_df.itertuples():
         if row.response_data:
             prefix = "https://apis.deutschebahn.com/db-api-marketplace/apis/timetables/v1/plan/"
             eva = row.url.removeprefix(prefix).split("/")[0]
-            rows.extend(get_plan_xml_rows(row.response_data, eva, eva_to_station.get(eva, None), row.timestamp))
+            rows.extend(get_plan_xml_rows(row.response_data, eva, row.timestamp))
 
     plan_df = pd.DataFrame(rows)
     return plan_df
@@ -104,7 +120,7 @@ def get_fchg_xml_rows(xml_string: str, xml_timestamp) -> list[dict]:
     return rows
 
 
-def get_fchg_db(xml_df, eva_to_station):
+def get_fchg_db(xml_df):
     raw_fchg_df = xml_df[(xml_df["api_name"] == "timetables/v1/fchg")]
 
     rows = []
@@ -149,8 +165,72 @@ def get_parquet_files(year: int, month: int):
     return sorted(parquet_files, key=sort_key)
 
 
-def process_files_to_temp(parquet_files: list[Path], eva_to_station: dict[str, str], temp_dir: Path):
-    """Process parquet files one by one and write plan/fchg data to temp directories."""
+def parse_raw_file(parquet_file: Path) -> tuple[int, pd.DataFrame, pd.DataFrame]:
+    """Parse one raw parquet file into its xml count and the plan and fchg rows."""
+    xml_df = pd.read_parquet(parquet_file)
+    xml_df = xml_df[xml_df["status_code"] == "200"]
+
+    plan_df = get_plan_db(xml_df)
+    fchg_df = get_fchg_db(xml_df)
+    return len(xml_df), plan_df, fchg_df
+
+
+def get_parse_cache_key(parquet_file: Path) -> str:
+    """Content-addressed cache key of a raw file: its path, size and hash plus the parser version."""
+    file_hash = hashlib.sha256()
+    with open(parquet_file, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(chunk)
+
+    key = f"{PARSE_CACHE_VERSION}|{Path(parquet_file).as_posix()}|{Path(parquet_file).stat().st_size}"
+    key += f"|{file_hash.hexdigest()}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def parse_raw_file_cached(parquet_file: Path, cache_dir: Path) -> tuple[Path, bool]:
+    """Return the cache entry of a raw file and whether it was reused, parsing the file only on a cache miss."""
+    cache_key = get_parse_cache_key(parquet_file)
+    entry_dir = Path(cache_dir) / cache_key[:2] / cache_key
+    if (entry_dir / "meta.json").exists():
+        return entry_dir, True
+
+    xml_count, plan_df, fchg_df = parse_raw_file(parquet_file)
+
+    # Write to a private directory first and rename it, so concurrent runs never see half-written entries
+    tmp_dir = entry_dir.with_name(f"{cache_key}.tmp-{os.getpid()}")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    if len(plan_df) > 0:
+        plan_df.to_parquet(tmp_dir / "plan.parquet", index=False)
+    if len(fchg_df) > 0:
+        fchg_df.to_parquet(tmp_dir / "fchg.parquet", index=False)
+    meta = {"source": str(parquet_file), "xml_count": xml_count, "plan_count": len(plan_df), "fchg_count": len(fchg_df)}
+    (tmp_dir / "meta.json").write_text(json.dumps(meta))
+    try:
+        tmp_dir.rename(entry_dir)
+    except OSError:
+        # Another process finished the same entry first
+        shutil.rmtree(tmp_dir)
+    return entry_dir, False
+
+
+def _link_or_copy(src: Path, dst: Path):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def process_files_to_temp(
+    parquet_files: list[Path],
+    temp_dir: Path,
+    cache_dir: Path | None = None,
+    cache_entries: dict[Path, Path] | None = None,
+):
+    """Process parquet files one by one and write plan/fchg data to temp directories.
+
+    With a cache_dir, every raw file is parsed at most once: later runs link the cached batches instead.
+    cache_entries maps raw files to cache entries that are already known, so they are not hashed again.
+    """
     plan_dir = temp_dir / "plan"
     fchg_dir = temp_dir / "fchg"
     plan_dir.mkdir(parents=True, exist_ok=True)
@@ -159,44 +239,809 @@ def process_files_to_temp(parquet_files: list[Path], eva_to_station: dict[str, s
     total_xml_count = 0
     total_plan_count = 0
     total_fchg_count = 0
+    reused_count = 0
 
     for i, parquet_file in enumerate(parquet_files):
+        plan_output = plan_dir / f"batch_{i:05d}.parquet"
+        fchg_output = fchg_dir / f"batch_{i:05d}.parquet"
+
+        if cache_dir is not None:
+            if cache_entries and parquet_file in cache_entries:
+                entry_dir, reused = cache_entries[parquet_file], True
+            else:
+                entry_dir, reused = parse_raw_file_cached(parquet_file, cache_dir)
+            reused_count += reused
+            meta = json.loads((entry_dir / "meta.json").read_text())
+            total_xml_count += meta["xml_count"]
+            if meta["plan_count"] > 0:
+                _link_or_copy(entry_dir / "plan.parquet", plan_output)
+                total_plan_count += meta["plan_count"]
+            if meta["fchg_count"] > 0:
+                _link_or_copy(entry_dir / "fchg.parquet", fchg_output)
+                total_fchg_count += meta["fchg_count"]
+            continue
+
         # Read one file at a time
-        xml_df = pd.read_parquet(parquet_file)
-        xml_df = xml_df[xml_df["status_code"] == "200"]
-        total_xml_count += len(xml_df)
+        xml_count, plan_df, fchg_df = parse_raw_file(parquet_file)
+        total_xml_count += xml_count
 
-        # Process plan data
-        plan_df = get_plan_db(xml_df, eva_to_station)
         if len(plan_df) > 0:
-            plan_output = plan_dir / f"batch_{i:05d}.parquet"
             plan_df.to_parquet(plan_output, index=False)
             total_plan_count += len(plan_df)
 
-        # Process fchg data
-        fchg_df = get_fchg_db(xml_df, eva_to_station)
         if len(fchg_df) > 0:
-            fchg_output = fchg_dir / f"batch_{i:05d}.parquet"
             fchg_df.to_parquet(fchg_output, index=False)
             total_fchg_count += len(fchg_df)
 
         # Clear memory
-        del xml_df, plan_df, fchg_df
+        del plan_df, fchg_df
+
+    if cache_dir is not None:
+        print(f"Reused {reused_count} of {len(parquet_files)} parsed raw files from {cache_dir}")
 
     return total_xml_count, total_plan_count, total_fchg_count
 
 
-def main(year: int, month: int, parquet_files, eva_to_station: dict, output_dir: Path):
+def register_station_names(con: duckdb.DuckDBPyConnection, eva_to_station: dict[str, str]):
+    """Register the EVA to station name mapping as the station_names table, joined once per release."""
+    station_names_df = pd.DataFrame({"eva": list(eva_to_station.keys()), "station_name": list(eva_to_station.values())})
+    con.register("station_names_df", station_names_df)
+    con.execute(
+        "CREATE TEMP TABLE station_names AS "
+        "SELECT eva::VARCHAR AS eva, station_name::VARCHAR AS station_name FROM station_names_df"
+    )
+    con.unregister("station_names_df")
+
+
+@dataclass
+class ReleaseLayout:
+    """Physical layout of the release parquet files; None keeps the DuckDB default."""
+
+    row_group_size: int | None = None
+    compression_level: int | None = None
+    # DuckDB writes a bloom filter for every dictionary encoded column. A larger dictionary size limit
+    # keeps high-cardinality lookup columns (eva, train_number, train_line_ride_id) dictionary encoded.
+    dictionary_size_limit: int | None = None
+    bloom_filter_fpp: float | None = None
+    # Secondary sort keys after time cluster lookup columns, so row group min/max statistics prune well
+    sort_by: tuple[str, ...] = ("time",)
+
+    def copy_options(self) -> str:
+        """Options for a DuckDB `COPY ... TO ... (FORMAT PARQUET, ...)` statement."""
+        options = ["FORMAT PARQUET"]
+        if self.compression_level is not None:
+            options += ["COMPRESSION zstd", f"COMPRESSION_LEVEL {int(self.compression_level)}"]
+        if self.row_group_size is not None:
+            options.append(f"ROW_GROUP_SIZE {int(self.row_group_size)}")
+        if self.dictionary_size_limit is not None:
+            options.append(f"DICTIONARY_SIZE_LIMIT {int(self.dictionary_size_limit)}")
+        if self.bloom_filter_fpp is not None:
+            options.append(f"BLOOM_FILTER_FALSE_POSITIVE_RATIO {float(self.bloom_filter_fpp)}")
+        return ", ".join(options)
+
+
+# Layout and artifacts of the published release, shared by --release (process_month.sh) and rebuild_months.py.
+# Sorting by day, eva and time keeps the stops of a station and day in one or two row groups,
+# see scripts/benchmark_release_layout.py.
+RELEASE_LAYOUT = ReleaseLayout(
+    row_group_size=65_536,
+    compression_level=9,
+    bloom_filter_fpp=0.01,
+    sort_by=("date_trunc('day', time)", "eva", "time"),
+)
+RELEASE_ARTIFACTS = {
+    "star_schema": True,
+    "station_partitions": True,
+    "change_history": True,
+    "planned_paths": True,
+    "segments": True,
+    "ride_index": True,
+    "board_index": True,
+    "sketches": True,
+    "stats_cube": True,
+}
+
+
+def get_duckdb_connection(
+    threads: int | None = None, memory_limit: str | None = None, temp_directory: Path | None = None
+) -> duckdb.DuckDBPyConnection:
+    """Create an in-memory DuckDB connection with explicit resource settings.
+
+    A memory limit together with a spill directory keeps the peak memory of the big
+    dedup/sort predictable, since DuckDB writes to disk instead of growing further.
+    """
+    con = duckdb.connect()
+    # The output is sorted explicitly, so the insertion order does not need to be kept in memory
+    con.execute("SET preserve_insertion_order = false")
+    if threads is not None:
+        con.execute(f"SET threads = {int(threads)}")
+    if memory_limit is not None:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+    if temp_directory is not None:
+        Path(temp_directory).mkdir(parents=True, exist_ok=True)
+        con.execute(f"SET temp_directory = '{temp_directory}'")
+    return con
+
+
+def get_release_query(
+    plan_source: str,
+    fchg_source: str,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    order_by: tuple[str, ...] = ("time",),
+    station_source: str = "station_names",
+) -> str:
+    """Build the query that deduplicates, merges and transforms plan and fchg rows into release rows.
+
+    The sources are DuckDB table expressions, e.g. a quoted parquet glob. The station names are
+    joined from station_source, see register_station_names. Without a date range all rows are returned.
+    """
+    time_filter = ""
+    if start_date is not None and end_date is not None:
+        time_filter = f"""
+        WHERE time >= TIMESTAMP '{start_date.strftime("%Y-%m-%d %H:%M:%S")}'
+            AND time < TIMESTAMP '{end_date.strftime("%Y-%m-%d %H:%M:%S")}'"""
+
+    return f"""
+        WITH plan_deduped AS (
+            SELECT DISTINCT ON (id)
+                id,
+                xml_station_name,
+                eva,
+                train_number,
+                line_number,
+                final_destination_station,
+                train_type,
+                arrival_planned_time,
+                departure_planned_time
+            FROM {plan_source}
+            ORDER BY id, xml_timestamp DESC
+        ),
+        fchg_deduped AS (
+            SELECT DISTINCT ON (id)
+                id,
+                arrival_change_time,
+                departure_change_time,
+                is_canceled
+            FROM {fchg_source}
+            ORDER BY id, xml_timestamp DESC
+        ),
+        merged AS (
+            SELECT
+                p.id,
+                s.station_name,
+                p.xml_station_name,
+                p.eva,
+                p.train_number,
+                p.line_number,
+                COALESCE(p.final_destination_station, s.station_name) AS final_destination_station,
+                p.train_type,
+                p.arrival_planned_time,
+                p.departure_planned_time,
+                COALESCE(f.arrival_change_time, p.arrival_planned_time) AS arrival_change_time,
+                COALESCE(f.departure_change_time, p.departure_planned_time) AS departure_change_time,
+                COALESCE(f.is_canceled, false) AS is_canceled
+            FROM plan_deduped p
+            LEFT JOIN fchg_deduped f ON p.id = f.id
+            LEFT JOIN {station_source} s ON p.eva = s.eva
+        ),
+        transformed AS (
+            SELECT
+                station_name,
+                xml_station_name,
+                eva,
+                train_number,
+                line_number,
+                final_destination_station,
+                CAST(COALESCE(
+                    date_diff('minute', departure_planned_time, departure_change_time),
+                    date_diff('minute', arrival_planned_time, arrival_change_time)
+                ) AS INTEGER) AS delay_in_min,
+                COALESCE(departure_change_time, arrival_change_time) AS time,
+                is_canceled,
+                train_type,
+                regexp_extract(id, '^(.*)-\\d{{10}}-\\d+$', 1) AS train_line_ride_id,
+                CAST(split_part(id, '-', -1) AS INTEGER) AS train_line_station_num,
+                arrival_planned_time,
+                arrival_change_time,
+                departure_planned_time,
+                departure_change_time,
+                id
+            FROM merged
+        )
+        SELECT * FROM transformed{time_filter}
+        ORDER BY {", ".join(order_by)}
+    """
+
+
+def get_change_history_query(fchg_source: str, release_source: str, order_by: tuple[str, ...] = ("id",)) -> str:
+    """Build the query that compacts all fchg observations of the released stops into their change history.
+
+    Consecutive identical observations of a stop are collapsed into one row with a repeat_count. Times
+    are stored as whole minutes relative to the planned time of the stop, so the absolute values can
+    be restored by joining the release on id.
+    """
+    return f"""
+        WITH observations AS (
+            SELECT
+                f.id,
+                f.xml_timestamp,
+                CAST(date_diff('minute', r.arrival_planned_time, f.arrival_change_time) AS INTEGER)
+                    AS arrival_delay_in_min,
+                CAST(date_diff('minute', r.departure_planned_time, f.departure_change_time) AS INTEGER)
+                    AS departure_delay_in_min,
+                COALESCE(f.is_canceled, false) AS is_canceled,
+                COALESCE(r.departure_planned_time, r.arrival_planned_time) AS planned_time
+            FROM {fchg_source} f
+            JOIN {release_source} r ON f.id = r.id
+        ),
+        flagged AS (
+            SELECT
+                *,
+                (arrival_delay_in_min, departure_delay_in_min, is_canceled) IS DISTINCT FROM lag(
+                    (arrival_delay_in_min, departure_delay_in_min, is_canceled)
+                ) OVER (PARTITION BY id ORDER BY xml_timestamp) AS is_new_run
+            FROM observations
+        ),
+        runs AS (
+            SELECT
+                *,
+                sum(CAST(is_new_run AS INTEGER)) OVER (PARTITION BY id ORDER BY xml_timestamp) AS change_num
+            FROM flagged
+        )
+        SELECT
+            id,
+            CAST(change_num AS SMALLINT) AS change_num,
+            CAST(date_diff('minute', any_value(planned_time), min(xml_timestamp)) AS INTEGER) AS observed_offset_in_min,
+            any_value(arrival_delay_in_min) AS arrival_delay_in_min,
+            any_value(departure_delay_in_min) AS departure_delay_in_min,
+            any_value(is_canceled) AS is_canceled,
+            CAST(count(*) AS SMALLINT) AS repeat_count
+        FROM runs
+        GROUP BY id, change_num
+        ORDER BY {", ".join(order_by)}, change_num
+    """
+
+
+def get_segments_query(release_source: str) -> str:
+    """Build the query that turns the stops of a release into segments between consecutive stops of a ride.
+
+    Segments run from the departure at one stop to the arrival at the next stop of the same
+    train_line_ride_id, found in a single window pass sorted by train_line_station_num. Stops missing
+    in the data are skipped, their segment then spans several station numbers.
+    """
+    return f"""
+        WITH stops AS (
+            SELECT
+                train_line_ride_id,
+                train_type,
+                line_number,
+                train_number,
+                train_line_station_num AS from_station_num,
+                eva AS from_eva,
+                station_name AS from_station_name,
+                departure_planned_time,
+                departure_change_time,
+                is_canceled AS from_is_canceled,
+                lead(train_line_station_num) OVER ride AS to_station_num,
+                lead(eva) OVER ride AS to_eva,
+                lead(station_name) OVER ride AS to_station_name,
+                lead(arrival_planned_time) OVER ride AS arrival_planned_time,
+                lead(arrival_change_time) OVER ride AS arrival_change_time,
+                lead(is_canceled) OVER ride AS to_is_canceled
+            FROM {release_source}
+            WINDOW ride AS (PARTITION BY train_line_ride_id ORDER BY train_line_station_num)
+        )
+        SELECT
+            train_line_ride_id,
+            train_type,
+            line_number,
+            train_number,
+            from_station_num,
+            to_station_num,
+            from_eva,
+            to_eva,
+            from_station_name,
+            to_station_name,
+            departure_planned_time,
+            CAST(date_diff('minute', departure_planned_time, arrival_planned_time) AS INTEGER)
+                AS planned_travel_time_in_min,
+            CAST(date_diff('minute', departure_change_time, arrival_change_time) AS INTEGER)
+                AS actual_travel_time_in_min,
+            CAST(date_diff('minute', departure_planned_time, departure_change_time) AS INTEGER)
+                AS departure_delay_in_min,
+            CAST(date_diff('minute', arrival_planned_time, arrival_change_time) AS INTEGER) AS arrival_delay_in_min,
+            arrival_delay_in_min - departure_delay_in_min AS delay_gained_in_min,
+            from_is_canceled OR to_is_canceled AS is_canceled
+        FROM stops
+        WHERE to_station_num IS NOT NULL
+            AND departure_planned_time IS NOT NULL
+            AND arrival_planned_time IS NOT NULL
+        ORDER BY departure_planned_time, from_eva
+    """
+
+
+def write_star_schema(con: duckdb.DuckDBPyConnection, release_file: Path, star_schema_dir: Path, layout: ReleaseLayout):
+    """Write a release file as a narrow fact table with int32 keys into station, train type and destination tables.
+
+    The station key is the numeric EVA number, so it is the same in every month. The train type and
+    destination keys are only valid within the month, the dimension tables are stored next to the facts.
+    """
+    star_schema_dir.mkdir(parents=True, exist_ok=True)
+    con.execute(f"CREATE OR REPLACE TEMP VIEW release AS SELECT * FROM '{release_file}'")
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE stations AS
+        SELECT
+            CAST(eva AS INTEGER) AS station_id,
+            eva,
+            arg_max(station_name, time) AS station_name,
+            arg_max(xml_station_name, time) AS xml_station_name
+        FROM release
+        GROUP BY eva
+    """)
+    for table, column in [("train_types", "train_type"), ("destinations", "final_destination_station")]:
+        key = "train_type_id" if table == "train_types" else "destination_id"
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE {table} AS
+            SELECT CAST(row_number() OVER (ORDER BY {column}) AS INTEGER) AS {key}, {column}
+            FROM (SELECT DISTINCT {column} FROM release WHERE {column} IS NOT NULL)
+        """)
+
+    for table, key in [
+        ("stations", "station_id"),
+        ("train_types", "train_type_id"),
+        ("destinations", "destination_id"),
+    ]:
+        con.execute(
+            f"COPY (SELECT * FROM {table} ORDER BY {key}) TO '{star_schema_dir / f'{table}.parquet'}' (FORMAT PARQUET)"
+        )
+
+    con.execute(f"""
+        COPY (
+            SELECT
+                CAST(r.eva AS INTEGER) AS station_id,
+                t.train_type_id,
+                d.destination_id,
+                r.train_number,
+                r.line_number,
+                r.delay_in_min,
+                r.time,
+                r.is_canceled,
+                r.train_line_ride_id,
+                r.train_line_station_num,
+                r.arrival_planned_time,
+                r.arrival_change_time,
+                r.departure_planned_time,
+                r.departure_change_time,
+                r.id
+            FROM release r
+            LEFT JOIN train_types t ON r.train_type = t.train_type
+            LEFT JOIN destinations d ON r.final_destination_station = d.final_destination_station
+            ORDER BY {", ".join(layout.sort_by)}
+        ) TO '{star_schema_dir / "facts.parquet"}' ({layout.copy_options()})
+    """)
+
+
+def write_planned_paths(con: duckdb.DuckDBPyConnection, plan_source: str, release_file: Path, paths_dir: Path):
+    """Write the planned paths of the released stops as interned lists of int32 station ids.
+
+    paths.parquet holds every distinct path once, path_stations.parquet the station names of the ids and
+    stop_paths.parquet the arrival (previous stations) and departure (next stations) path of every stop.
+    The ids are only valid within the month.
+    """
+    paths_dir.mkdir(parents=True, exist_ok=True)
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE stop_path_strings AS
+        SELECT DISTINCT ON (id)
+            id,
+            -- A path column without any value is read as an all-null INT32 column
+            NULLIF(CAST(arrival_planned_path AS VARCHAR), '') AS arrival_planned_path,
+            NULLIF(CAST(departure_planned_path AS VARCHAR), '') AS departure_planned_path
+        FROM {plan_source}
+        WHERE id IN (SELECT id FROM '{release_file}')
+        ORDER BY id, xml_timestamp DESC
+    """)
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE path_strings AS
+        SELECT CAST(row_number() OVER (ORDER BY path) AS INTEGER) AS path_id, path
+        FROM (
+            SELECT arrival_planned_path AS path FROM stop_path_strings
+            UNION
+            SELECT departure_planned_path AS path FROM stop_path_strings
+        )
+        WHERE path IS NOT NULL
+    """)
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE path_elements AS
+        SELECT
+            path_id,
+            unnest(string_split(path, '|')) AS station_name,
+            generate_subscripts(string_split(path, '|'), 1) AS position
+        FROM path_strings
+    """)
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE path_stations AS
+        SELECT CAST(row_number() OVER (ORDER BY station_name) AS INTEGER) AS path_station_id, station_name
+        FROM (SELECT DISTINCT station_name FROM path_elements)
+    """)
+
+    con.execute(f"""
+        COPY (SELECT * FROM path_stations ORDER BY path_station_id)
+        TO '{paths_dir / "path_stations.parquet"}' (FORMAT PARQUET)
+    """)
+    con.execute(f"""
+        COPY (
+            SELECT e.path_id, list(s.path_station_id ORDER BY e.position) AS path_station_ids
+            FROM path_elements e
+            JOIN path_stations s USING (station_name)
+            GROUP BY e.path_id
+            ORDER BY e.path_id
+        ) TO '{paths_dir / "paths.parquet"}' (FORMAT PARQUET, COMPRESSION zstd)
+    """)
+    con.execute(f"""
+        COPY (
+            SELECT sp.id, a.path_id AS arrival_path_id, d.path_id AS departure_path_id
+            FROM stop_path_strings sp
+            LEFT JOIN path_strings a ON sp.arrival_planned_path = a.path
+            LEFT JOIN path_strings d ON sp.departure_planned_path = d.path
+            ORDER BY sp.id
+        ) TO '{paths_dir / "stop_paths.parquet"}' (FORMAT PARQUET, COMPRESSION zstd)
+    """)
+
+
+def register_release_row_groups(con: duckdb.DuckDBPyConnection, release_file: Path):
+    """Create the temp table release_row_groups with the first row number of every row group of a release file."""
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE release_row_groups AS
+        SELECT
+            CAST(row_group_id AS INTEGER) AS row_group_id,
+            sum(row_group_num_rows) OVER (ORDER BY row_group_id) - row_group_num_rows AS first_row
+        FROM (SELECT DISTINCT row_group_id, row_group_num_rows FROM parquet_metadata('{release_file}'))
+    """)
+
+
+def write_ride_index(con: duckdb.DuckDBPyConnection, release_file: Path, index_file: Path):
+    """Write the row groups of a release file that contain the stops of every ride.
+
+    The index is sorted by train_line_ride_id, so a lookup only reads a few of its row groups and then
+    only the listed row groups of the release file, see release_lookup.py.
+    """
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    register_release_row_groups(con, release_file)
+    con.execute(f"""
+        COPY (
+            SELECT
+                r.train_line_ride_id,
+                any_value(r.train_number) AS train_number,
+                any_value(r.train_type) AS train_type,
+                list(DISTINCT g.row_group_id ORDER BY g.row_group_id) AS row_groups,
+                CAST(count(*) AS INTEGER) AS stops
+            FROM read_parquet('{release_file}', file_row_number = true) r
+            ASOF JOIN release_row_groups g ON r.file_row_number >= g.first_row
+            GROUP BY r.train_line_ride_id
+            ORDER BY r.train_line_ride_id
+        ) TO '{index_file}' (FORMAT PARQUET, COMPRESSION zstd, ROW_GROUP_SIZE 8192)
+    """)
+
+
+def write_board_index(con: duckdb.DuckDBPyConnection, release_file: Path, index_file: Path):
+    """Write the row groups of a release file that contain the stops of every station and hour.
+
+    The index is sorted by eva and hour, so the board of a station over a time range is found in a
+    few index row groups, see release_lookup.py.
+    """
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    register_release_row_groups(con, release_file)
+    con.execute(f"""
+        COPY (
+            SELECT
+                r.eva,
+                date_trunc('hour', r.time) AS hour,
+                list(DISTINCT g.row_group_id ORDER BY g.row_group_id) AS row_groups,
+                CAST(count(*) AS INTEGER) AS stops
+            FROM read_parquet('{release_file}', file_row_number = true) r
+            ASOF JOIN release_row_groups g ON r.file_row_number >= g.first_row
+            GROUP BY r.eva, hour
+            ORDER BY r.eva, hour
+        ) TO '{index_file}' (FORMAT PARQUET, COMPRESSION zstd, ROW_GROUP_SIZE 8192)
+    """)
+
+
+def get_prefix_sums_file(output_dir: Path, year: int, month: int) -> Path:
+    return Path(output_dir) / "daily_aggregates" / f"prefix-sums-{year}-{month:02d}.parquet"
+
+
+def get_prefix_sums_chain_start(con: duckdb.DuckDBPyConnection, prefix_sums_file: Path) -> str | None:
+    """First month (YYYY-MM) whose stops are counted in the totals of a prefix sums file."""
+    row = con.execute(
+        f"SELECT value FROM parquet_kv_metadata('{prefix_sums_file}') WHERE key = 'chain_start'"
+    ).fetchone()
+    return row[0].decode() if row else None
+
+
+def write_daily_prefix_sums(
+    con: duckdb.DuckDBPyConnection,
+    release_file: Path,
+    output_dir: Path,
+    year: int,
+    month: int,
+    first_month: tuple[int, int] = FIRST_MONTH,
+):
+    """Write the running totals of stops, cancellations, delays and punctual stops per station, train type and day.
+
+    The totals continue from the previous month in daily_aggregates/ and every station and train type of
+    that month gets a row on the first day, so the totals up to any day are the last row up to that day in
+    the file of its month. Months therefore have to be written in order, first_month starts at zero.
+
+    If the previous month is missing, the totals restart at zero with a warning instead of failing the
+    release. The first counted month is stored as chain_start in the file metadata, so daily_stats.py can
+    refuse ranges before a restart until the months are rewritten with rebuild_months.py --daily-aggregates.
+    """
+    prefix_sums_file = get_prefix_sums_file(output_dir, year, month)
+    prefix_sums_file.parent.mkdir(parents=True, exist_ok=True)
+    month_start = datetime(year, month, 1)
+
+    carried = ""
+    chain_start = f"{first_month[0]}-{first_month[1]:02d}"
+    prev_month = 12 if month == 1 else month - 1
+    prev_year = year - 1 if month == 1 else year
+    prev_file = get_prefix_sums_file(output_dir, prev_year, prev_month)
+    if (year, month) != first_month and not prev_file.exists():
+        chain_start = f"{year}-{month:02d}"
+        print(
+            f"Warning: {prev_file} is missing, the prefix sums restart at zero in {chain_start}. "
+            "Rewrite them with rebuild_months.py --daily-aggregates to query ranges before this month."
+        )
+    elif (year, month) != first_month:
+        chain_start = get_prefix_sums_chain_start(con, prev_file) or chain_start
+        carried = f"""
+            UNION ALL
+            SELECT eva, train_type, DATE '{month_start:%Y-%m-%d}', stops, canceled_stops, delay_sum_in_min, punctual_stops
+            FROM (
+                SELECT DISTINCT ON (eva, train_type) *
+                FROM '{prev_file}'
+                ORDER BY eva, train_type, date DESC
+            )"""
+
+    con.execute(f"""
+        COPY (
+            WITH increments AS (
+                SELECT
+                    eva,
+                    train_type,
+                    CAST(time AS DATE) AS date,
+                    count(*) AS stops,
+                    count(*) FILTER (is_canceled) AS canceled_stops,
+                    COALESCE(sum(delay_in_min) FILTER (NOT is_canceled), 0) AS delay_sum_in_min,
+                    count(*) FILTER (NOT is_canceled AND delay_in_min < 6) AS punctual_stops
+                FROM '{release_file}'
+                GROUP BY ALL{carried}
+            )
+            SELECT
+                eva,
+                train_type,
+                date,
+                CAST(sum(sum(stops)) OVER totals AS BIGINT) AS stops,
+                CAST(sum(sum(canceled_stops)) OVER totals AS BIGINT) AS canceled_stops,
+                CAST(sum(sum(delay_sum_in_min)) OVER totals AS BIGINT) AS delay_sum_in_min,
+                CAST(sum(sum(punctual_stops)) OVER totals AS BIGINT) AS punctual_stops
+            FROM increments
+            GROUP BY eva, train_type, date
+            WINDOW totals AS (PARTITION BY eva, train_type ORDER BY date)
+            ORDER BY eva, train_type, date
+        ) TO '{prefix_sums_file}' (FORMAT PARQUET, COMPRESSION zstd, KV_METADATA {{chain_start: '{chain_start}'}})
+    """)
+    return prefix_sums_file
+
+
+def write_delay_sketches(con: duckdb.DuckDBPyConnection, release_file: Path, sketches_file: Path):
+    """Write mergeable sketches of the delays and rides per station, train type and day.
+
+    Delays are whole minutes, so the delay sketch is an exact sparse histogram of the stops that were
+    not canceled, merged by adding the stops per delay. The rides are a sparse HyperLogLog, merged by
+    the maximum rank per register.
+    """
+    sketches_file.parent.mkdir(parents=True, exist_ok=True)
+    suffix_bits = 64 - HLL_PRECISION
+    con.execute(f"""
+        COPY (
+            WITH delays AS (
+                SELECT eva, train_type, CAST(time AS DATE) AS date, delay_in_min, count(*) AS stops
+                FROM '{release_file}'
+                WHERE NOT is_canceled AND delay_in_min IS NOT NULL
+                GROUP BY ALL
+            ),
+            ride_hashes AS (
+                SELECT
+                    eva,
+                    train_type,
+                    CAST(time AS DATE) AS date,
+                    hash(train_line_ride_id) AS h
+                FROM '{release_file}'
+            ),
+            registers AS (
+                SELECT
+                    eva,
+                    train_type,
+                    date,
+                    CAST(h >> {suffix_bits} AS SMALLINT) AS register,
+                    CAST(max(
+                        CASE WHEN h & ((1::UBIGINT << {suffix_bits}) - 1) = 0 THEN {suffix_bits + 1}
+                        ELSE {suffix_bits} - floor(log2(h & ((1::UBIGINT << {suffix_bits}) - 1))) END
+                    ) AS TINYINT) AS rank
+                FROM ride_hashes
+                GROUP BY ALL
+            ),
+            delay_sketches AS (
+                SELECT
+                    eva,
+                    train_type,
+                    date,
+                    list(struct_pack(delay_in_min := CAST(delay_in_min AS SMALLINT), stops := CAST(stops AS INTEGER)))
+                        AS delay_histogram
+                FROM delays
+                GROUP BY ALL
+            ),
+            ride_sketches AS (
+                SELECT
+                    eva,
+                    train_type,
+                    date,
+                    list(struct_pack(register, rank)) AS ride_registers
+                FROM registers
+                GROUP BY ALL
+            )
+            SELECT r.eva, r.train_type, r.date, d.delay_histogram, r.ride_registers
+            FROM ride_sketches r
+            LEFT JOIN delay_sketches d
+                ON r.eva = d.eva AND r.train_type IS NOT DISTINCT FROM d.train_type AND r.date = d.date
+            ORDER BY r.date, r.eva, r.train_type
+        ) TO '{sketches_file}' (FORMAT PARQUET, COMPRESSION zstd)
+    """)
+
+
+def write_stats_cube(con: duckdb.DuckDBPyConnection, release_file: Path, cube_dir: Path, year: int, month: int):
+    """Write the pre-aggregated statistics of a month for the stats notebooks.
+
+    cube-YYYY-MM.parquet has the stops, cancellations, delay sum and punctual stops (less than 6
+    minutes delay) and a sparse delay histogram per station, train type, day and hour. Delay sums,
+    punctual stops and histograms only count stops that were not canceled. trains-YYYY-MM.parquet has
+    the stops, cancellations and delay sum of all stops (including canceled ones) per train and day.
+    """
+    cube_dir.mkdir(parents=True, exist_ok=True)
+    cube_file = cube_dir / f"cube-{year}-{month:02d}.parquet"
+    trains_file = cube_dir / f"trains-{year}-{month:02d}.parquet"
+    con.execute(f"""
+        COPY (
+            WITH cells AS (
+                SELECT
+                    eva,
+                    station_name,
+                    train_type,
+                    CAST(time AS DATE) AS date,
+                    CAST(hour(time) AS TINYINT) AS hour,
+                    is_canceled,
+                    delay_in_min,
+                    count(*) AS stops
+                FROM '{release_file}'
+                GROUP BY ALL
+            )
+            SELECT
+                eva,
+                station_name,
+                train_type,
+                date,
+                hour,
+                CAST(sum(stops) AS INTEGER) AS stops,
+                CAST(COALESCE(sum(stops) FILTER (is_canceled), 0) AS INTEGER) AS canceled_stops,
+                CAST(COALESCE(sum(delay_in_min * stops) FILTER (NOT is_canceled), 0) AS BIGINT) AS delay_sum_in_min,
+                CAST(COALESCE(sum(stops) FILTER (NOT is_canceled AND delay_in_min < 6), 0) AS INTEGER)
+                    AS punctual_stops,
+                list(struct_pack(delay_in_min := CAST(delay_in_min AS SMALLINT), stops := CAST(stops AS INTEGER)))
+                    FILTER (NOT is_canceled AND delay_in_min IS NOT NULL) AS delay_histogram
+            FROM cells
+            GROUP BY ALL
+            ORDER BY date, hour, eva, train_type
+        ) TO '{cube_file}' (FORMAT PARQUET, COMPRESSION zstd)
+    """)
+    con.execute(f"""
+        COPY (
+            SELECT
+                train_type,
+                train_number,
+                CAST(time AS DATE) AS date,
+                CAST(count(*) AS INTEGER) AS stops,
+                CAST(count(*) FILTER (is_canceled) AS INTEGER) AS canceled_stops,
+                CAST(COALESCE(sum(delay_in_min), 0) AS BIGINT) AS delay_sum_in_min
+            FROM '{release_file}'
+            GROUP BY ALL
+            ORDER BY date, train_type, train_number
+        ) TO '{trains_file}' (FORMAT PARQUET, COMPRESSION zstd)
+    """)
+    return cube_file, trains_file
+
+
+def write_station_partitions(
+    con: duckdb.DuckDBPyConnection, release_file: Path, station_dir: Path, row_group_size: int = 8192
+):
+    """Write a release file split into station buckets with small row groups, for HTTP range requests.
+
+    All EVA numbers of a station share the bucket of its smallest EVA number, so a station is always
+    in a single file. stations.parquet lists the bucket of every station.
+    """
+    if station_dir.exists():
+        shutil.rmtree(station_dir)
+    station_dir.parent.mkdir(parents=True, exist_ok=True)
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE station_buckets AS
+        SELECT
+            eva,
+            any_value(station_name) AS station_name,
+            CAST(min(CAST(eva AS INTEGER)) OVER (PARTITION BY coalesce(any_value(station_name), eva))
+                % {STATION_BUCKETS} AS INTEGER) AS bucket,
+            count(*) AS stops
+        FROM '{release_file}'
+        GROUP BY eva
+    """)
+    # Sorted by station, then time, so the min/max statistics of the small row groups skip other stations
+    con.execute("SET preserve_insertion_order = true")
+    con.execute(f"""
+        COPY (
+            SELECT r.*, b.bucket
+            FROM '{release_file}' r
+            JOIN station_buckets b USING (eva)
+            ORDER BY r.eva, r.time
+        ) TO '{station_dir}' (
+            FORMAT PARQUET,
+            PARTITION_BY (bucket),
+            FILENAME_PATTERN 'data',
+            COMPRESSION zstd,
+            ROW_GROUP_SIZE {int(row_group_size)}
+        )
+    """)
+    con.execute("SET preserve_insertion_order = false")
+    con.execute(f"""
+        COPY (SELECT * FROM station_buckets ORDER BY station_name, eva)
+        TO '{station_dir / "stations.parquet"}' (FORMAT PARQUET)
+    """)
+
+
+def main(
+    year: int,
+    month: int,
+    parquet_files,
+    eva_to_station: dict,
+    output_dir: Path,
+    threads: int | None = None,
+    memory_limit: str | None = None,
+    duckdb_temp_dir: Path | None = None,
+    cache_dir: Path | None = None,
+    layout: ReleaseLayout | None = None,
+    cache_entries: dict[Path, Path] | None = None,
+    star_schema: bool = False,
+    station_partitions: bool = False,
+    change_history: bool = False,
+    planned_paths: bool = False,
+    segments: bool = False,
+    ride_index: bool = False,
+    board_index: bool = False,
+    daily_aggregates: bool = False,
+    sketches: bool = False,
+    stats_cube: bool = False,
+):
     start_time = time.time()
 
     # Setup paths
     output_dir = Path(output_dir)
     output_dir.mkdir(exist_ok=True)
     output_file = output_dir / f"data-{year}-{month:02d}.parquet"
-    temp_dir = output_dir / "temp_monthly_processing"
+    # One temp directory per month, so several months can be processed side by side
+    temp_dir = output_dir / f"temp_monthly_processing_{year}-{month:02d}"
 
     # Process files one by one and write to temp directories
-    total_xml_count, total_plan_count, total_fchg_count = process_files_to_temp(parquet_files, eva_to_station, temp_dir)
+    total_xml_count, total_plan_count, total_fchg_count = process_files_to_temp(
+        parquet_files, temp_dir, cache_dir, cache_entries
+    )
 
     print(f"There are {total_xml_count:_} valid .xml strings")
     print(f"Containing {total_plan_count:_} planed schedules")
@@ -213,96 +1058,176 @@ def main(year: int, month: int, parquet_files, eva_to_station: dict, output_dir:
     else:
         end_date = datetime(year, month + 1, 1)
 
-    duckdb.sql(f"""
-        COPY (
-            WITH plan_deduped AS (
-                SELECT DISTINCT ON (id)
-                    id,
-                    station_name,
-                    xml_station_name,
-                    eva,
-                    train_number,
-                    line_number,
-                    final_destination_station,
-                    train_type,
-                    arrival_planned_time,
-                    departure_planned_time
-                FROM '{plan_pattern}'
-                ORDER BY id, xml_timestamp DESC
-            ),
-            fchg_deduped AS (
-                SELECT DISTINCT ON (id)
-                    id,
-                    arrival_change_time,
-                    departure_change_time,
-                    is_canceled
-                FROM '{fchg_pattern}'
-                ORDER BY id, xml_timestamp DESC
-            ),
-            merged AS (
-                SELECT
-                    p.id,
-                    p.station_name,
-                    p.xml_station_name,
-                    p.eva,
-                    p.train_number,
-                    p.line_number,
-                    p.final_destination_station,
-                    p.train_type,
-                    p.arrival_planned_time,
-                    p.departure_planned_time,
-                    COALESCE(f.arrival_change_time, p.arrival_planned_time) AS arrival_change_time,
-                    COALESCE(f.departure_change_time, p.departure_planned_time) AS departure_change_time,
-                    COALESCE(f.is_canceled, false) AS is_canceled
-                FROM plan_deduped p
-                LEFT JOIN fchg_deduped f ON p.id = f.id
-            ),
-            transformed AS (
-                SELECT
-                    station_name,
-                    xml_station_name,
-                    eva,
-                    train_number,
-                    line_number,
-                    final_destination_station,
-                    CAST(COALESCE(
-                        date_diff('minute', departure_planned_time, departure_change_time),
-                        date_diff('minute', arrival_planned_time, arrival_change_time)
-                    ) AS INTEGER) AS delay_in_min,
-                    COALESCE(departure_change_time, arrival_change_time) AS time,
-                    is_canceled,
-                    train_type,
-                    regexp_extract(id, '^(.*)-\\d{{10}}-\\d+$', 1) AS train_line_ride_id,
-                    CAST(split_part(id, '-', -1) AS INTEGER) AS train_line_station_num,
-                    arrival_planned_time,
-                    arrival_change_time,
-                    departure_planned_time,
-                    departure_change_time,
-                    id
-                FROM merged
-                ORDER BY time
-            )
-            SELECT * FROM transformed
-            WHERE time >= TIMESTAMP '{start_date.strftime("%Y-%m-%d %H:%M:%S")}'
-                AND time < TIMESTAMP '{end_date.strftime("%Y-%m-%d %H:%M:%S")}'
-        ) TO '{output_file}' (FORMAT PARQUET)
-    """)
+    layout = layout or ReleaseLayout()
+    release_query = get_release_query(f"'{plan_pattern}'", f"'{fchg_pattern}'", start_date, end_date, layout.sort_by)
 
+    con = get_duckdb_connection(threads, memory_limit, duckdb_temp_dir or temp_dir / "duckdb_spill")
+    register_station_names(con, eva_to_station)
+    con.execute(f"COPY ({release_query}) TO '{output_file}' ({layout.copy_options()})")
     print(f"Saved records to {output_file}")
 
+    if change_history:
+        history_file = output_dir / "change_history" / f"history-{year}-{month:02d}.parquet"
+        history_file.parent.mkdir(exist_ok=True)
+        history_query = get_change_history_query(f"'{fchg_pattern}'", f"'{output_file}'")
+        con.execute(f"COPY ({history_query}) TO '{history_file}' ({layout.copy_options()})")
+        print(f"Saved change history to {history_file}")
+
+    if planned_paths:
+        paths_dir = output_dir / "planned_paths" / f"month={year}-{month:02d}"
+        write_planned_paths(con, f"'{plan_pattern}'", output_file, paths_dir)
+        print(f"Saved planned paths to {paths_dir}")
+
+    if segments:
+        segments_file = output_dir / "segments" / f"segments-{year}-{month:02d}.parquet"
+        segments_file.parent.mkdir(exist_ok=True)
+        segments_query = get_segments_query(f"'{output_file}'")
+        con.execute(f"COPY ({segments_query}) TO '{segments_file}' ({layout.copy_options()})")
+        print(f"Saved segments to {segments_file}")
+
+    if ride_index:
+        index_file = output_dir / "ride_index" / f"rides-{year}-{month:02d}.parquet"
+        write_ride_index(con, output_file, index_file)
+        print(f"Saved ride index to {index_file}")
+
+    if board_index:
+        index_file = output_dir / "board_index" / f"boards-{year}-{month:02d}.parquet"
+        write_board_index(con, output_file, index_file)
+        print(f"Saved board index to {index_file}")
+
+    if daily_aggregates:
+        prefix_sums_file = write_daily_prefix_sums(con, output_file, output_dir, year, month)
+        print(f"Saved daily prefix sums to {prefix_sums_file}")
+
+    if sketches:
+        sketches_file = output_dir / "sketches" / f"sketches-{year}-{month:02d}.parquet"
+        write_delay_sketches(con, output_file, sketches_file)
+        print(f"Saved delay sketches to {sketches_file}")
+
+    if stats_cube:
+        cube_file, trains_file = write_stats_cube(con, output_file, output_dir / "stats_cube", year, month)
+        print(f"Saved statistics cube to {cube_file} and {trains_file}")
+
+    if star_schema:
+        star_schema_dir = output_dir / "star_schema" / f"month={year}-{month:02d}"
+        write_star_schema(con, output_file, star_schema_dir, layout)
+        print(f"Saved star schema to {star_schema_dir}")
+
+    if station_partitions:
+        station_dir = output_dir / "by_station" / f"month={year}-{month:02d}"
+        write_station_partitions(con, output_file, station_dir)
+        print(f"Saved station partitions to {station_dir}")
+
+    con.close()
+
     # Clean up temp directory
     shutil.rmtree(temp_dir)
     print(f"Total processing time: {time.time() - start_time:.2f} seconds")
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: uv run scripts/create_monthly_data_release.py <year> <month>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Create the monthly processed data release from the raw data")
+    parser.add_argument("year", type=int)
+    parser.add_argument("month", type=int)
+    parser.add_argument("--threads", type=int, default=None, help="DuckDB thread count (default: all cores)")
+    parser.add_argument("--memory-limit", default=None, help="DuckDB memory limit, e.g. '4GB' (default: 80%% of RAM)")
+    parser.add_argument(
+        "--duckdb-temp-dir", type=Path, default=None, help="Directory DuckDB spills to when over the memory limit"
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, default=None, help="Reuse parsed plan/fchg batches of unchanged raw files from here"
+    )
+    parser.add_argument("--row-group-size", type=int, default=None, help="Rows per parquet row group")
+    parser.add_argument("--compression-level", type=int, default=None, help="Write with zstd at this level (1-22)")
+    parser.add_argument(
+        "--dictionary-size-limit",
+        type=int,
+        default=None,
+        help="Dictionary size limit per column; dictionary encoded columns get bloom filters",
+    )
+    parser.add_argument("--bloom-filter-fpp", type=float, default=None, help="Bloom filter false positive ratio")
+    parser.add_argument(
+        "--sort-by", nargs="+", default=["time"], help="Sort expressions of the output, e.g. 'time eva'"
+    )
+    parser.add_argument(
+        "--release",
+        action="store_true",
+        help="Write the published release: RELEASE_LAYOUT, all artifacts and the daily prefix sums",
+    )
+    parser.add_argument(
+        "--star-schema", action="store_true", help="Also write int-keyed fact and dimension tables to star_schema/"
+    )
+    parser.add_argument(
+        "--station-partitions",
+        action="store_true",
+        help="Also write the month split into station buckets with small row groups to by_station/",
+    )
+    parser.add_argument(
+        "--change-history",
+        action="store_true",
+        help="Also write every distinct change observation per stop to change_history/",
+    )
+    parser.add_argument(
+        "--planned-paths",
+        action="store_true",
+        help="Also write the planned path of every stop as interned station id lists to planned_paths/",
+    )
+    parser.add_argument(
+        "--segments",
+        action="store_true",
+        help="Also write the segments between consecutive stops of every ride to segments/",
+    )
+    parser.add_argument(
+        "--ride-index",
+        action="store_true",
+        help="Also write the row groups of every ride to ride_index/ for fast journey lookups",
+    )
+    parser.add_argument(
+        "--board-index",
+        action="store_true",
+        help="Also write the row groups of every station and hour to board_index/ for fast board lookups",
+    )
+    parser.add_argument(
+        "--daily-aggregates",
+        action="store_true",
+        help="Also append the running daily totals per station and train type to daily_aggregates/",
+    )
+    parser.add_argument(
+        "--sketches",
+        action="store_true",
+        help="Also write mergeable delay and ride sketches per station, train type and day to sketches/",
+    )
+    parser.add_argument(
+        "--stats-cube",
+        action="store_true",
+        help="Also write the statistics per station, train type, day and hour for the notebooks to stats_cube/",
+    )
+    args = parser.parse_args()
 
-    year = int(sys.argv[1])
-    month = int(sys.argv[2])
+    layout = ReleaseLayout(
+        row_group_size=args.row_group_size,
+        compression_level=args.compression_level,
+        dictionary_size_limit=args.dictionary_size_limit,
+        bloom_filter_fpp=args.bloom_filter_fpp,
+        sort_by=tuple(args.sort_by),
+    )
+    artifacts = {name: getattr(args, name) for name in [*RELEASE_ARTIFACTS, "daily_aggregates"]}
+    if args.release:
+        layout = RELEASE_LAYOUT
+        artifacts = {**RELEASE_ARTIFACTS, "daily_aggregates": True}
 
     eva_to_station = json.load(open("config/eva_to_station_name.json"))
-    parquet_files = get_parquet_files(year, month)
-    main(year, month, parquet_files, eva_to_station, output_dir=Path("monthly_processed_data"))
+    parquet_files = get_parquet_files(args.year, args.month)
+    main(
+        args.year,
+        args.month,
+        parquet_files,
+        eva_to_station,
+        output_dir=Path("monthly_processed_data"),
+        threads=args.threads,
+        memory_limit=args.memory_limit,
+        duckdb_temp_dir=args.duckdb_temp_dir,
+        cache_dir=args.cache_dir,
+        layout=layout,
+        **artifacts,
+    )
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import aiohttp
+
+
+async def run_load_test(
+    base_url: str, requests: int, concurrency: int, stations: int, start: str | None, end: str | None, seed: int = 0
+) -> dict:
+    """Send station and daily requests from concurrent workers and return throughput and latencies.
+
+    The station requests are drawn from the busiest stations, so repeated dashboard queries hit the cache.
+    Every tenth request is for the daily statistics of all stations.
+    """
+    rng = random.Random(seed)
+    params = {key: value for key, value in [("start", start), ("end", end)] if value}
+    async with aiohttp.ClientSession(base_url) as session:
+        async with session.get("/stations") as response:
+            response.raise_for_status()
+            evas = [row["eva"] for row in await response.json()][:stations]
+        paths = [f"/stations/{rng.choice(evas)}" for _ in range(requests)]
+        for i in range(0, requests, 10):
+            paths[i] = "/daily"
+
+        latencies = []
+        errors = 0
+        pending = iter(paths)
+
+        async def worker():
+            nonlocal errors
+            for path in pending:
+                start_time = time.perf_counter()
+                async with session.get(path, params=params) as response:
+                    await response.read()
+                    errors += response.status != 200
+                latencies.append((time.perf_counter() - start_time) * 1000)
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - start_time
+
+        async with session.get("/cache") as response:
+            cache = await response.json()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "queries_per_second": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "cache_hits": cache["hits"],
+        "cache_misses": cache["misses"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the local query service and report queries per second")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stations", type=int, default=50, help="Draw station requests from the N busiest stations")
+    parser.add_argument("--start", default=None, help="Start date of the queried range, e.g. 2025-07-01")
+    parser.add_argument("--end", default=None, help="End date of the queried range, e.g. 2025-07-31")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load_test(args.url, args.requests, args.concurrency, args.stations, args.start, args.end))
+    print(f"{result['requests']:_} requests ({result['errors']} errors)")
+    print(f"{result['queries_per_second']:.0f} queries per second")
+    print(f"Latency p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    print(f"Cache hits {result['cache_hits']:_}, misses {result['cache_misses']:_}")
@@ -0,0 +1,48 @@
+#!/bin/bash
+
+# Upsert one day of Deutsche Bahn data into the daily processed data: download
+# the raw data of the day and the snapshots of the neighbouring days from
+# Hugging Face, run the daily release script, and upload the new snapshots
+# and delta files back.
+#
+# Usage: scripts/process_day.sh DATE
+# Example: scripts/process_day.sh 2025-07-15
+
+set -euo pipefail
+
+if [ $# -ne 1 ]; then
+    echo "Usage: $0 DATE"
+    exit 1
+fi
+
+REPO_ID="piebro/deutsche-bahn-data"
+OUTPUT_DIR="daily_processed_data"
+
+DATE="$1"
+YEAR=$(date -d "$DATE" +"%Y")
+MONTH_NO_ZERO=$((10#$(date -d "$DATE" +"%m")))
+DAY_NO_ZERO=$((10#$(date -d "$DATE" +"%d")))
+# Stop ids span about a day, so the snapshots of the neighbouring days are needed for the merge.
+DATE_BEFORE=$(date -d "$DATE - 1 day" +"%Y-%m-%d")
+DATE_AFTER=$(date -d "$DATE + 1 day" +"%Y-%m-%d")
+
+echo "=== Processing $DATE ==="
+
+uv run --with "huggingface_hub[cli]" hf download "$REPO_ID" \
+    --repo-type=dataset \
+    --include "raw_data/year=$YEAR/month=$MONTH_NO_ZERO/day=$DAY_NO_ZERO/*" \
+    --include "$OUTPUT_DIR/snapshots/*/date=$DATE_BEFORE.parquet" \
+    --include "$OUTPUT_DIR/snapshots/*/date=$DATE_AFTER.parquet" \
+    --local-dir .
+
+echo "Running daily release script..."
+uv run python scripts/create_daily_data_release.py "$DATE" --output-dir "$OUTPUT_DIR"
+
+echo "Uploading snapshots and deltas of $DATE..."
+uv run --with "huggingface_hub[cli]" hf upload "$REPO_ID" "$OUTPUT_DIR" "$OUTPUT_DIR" \
+    --repo-type=dataset \
+    --include "snapshots/*/date=$DATE.parquet" \
+    --include "month=*/delta-$DATE.parquet" \
+    --commit-message="Daily data release for $DATE - $(date -u +"%Y-%m-%d %H:%M:%S UTC")"
+
+echo "=== Done $DATE ==="
@@ -1,11 +1,15 @@
 #!/bin/bash
 
 # Process one month of Deutsche Bahn data: download the target month's raw
-# data (plus adjacent months for cross-midnight trains) from Hugging Face,
-# run the monthly release script, and upload the resulting parquet back.
+# data (plus adjacent months for cross-midnight trains) and the previous
+# month's daily prefix sums from Hugging Face, run the monthly release script,
+# and upload the resulting parquet back.
 #
 # Usage: scripts/process_month.sh YEAR MONTH
 # Example: scripts/process_month.sh 2025 7
+#
+# Set PARSE_CACHE_DIR to reuse parsed raw files between runs, so a rebuild
+# only parses raw files that are new or changed.
 
 set -euo pipefail
 
@@ -36,16 +40,33 @@ uv run --with "huggingface_hub[cli]" hf download "$REPO_ID" \
     --include "raw_data/year=$YEAR_BEFORE/month=$MONTH_BEFORE_NO_ZERO/*" \
     --include "raw_data/year=$YEAR/month=$MONTH_NO_ZERO/*" \
     --include "raw_data/year=$YEAR_AFTER/month=$MONTH_AFTER_NO_ZERO/*" \
+    --include "monthly_processed_data/daily_aggregates/prefix-sums-$YEAR_BEFORE-$MONTH_BEFORE.parquet" \
     --local-dir .
 
 echo "Running monthly release script..."
-uv run python scripts/create_monthly_data_release.py "$YEAR" "$MONTH_NO_ZERO"
-
-DATA_FILE="monthly_processed_data/data-$YEAR-$MONTH_PADDED.parquet"
+# Cap DuckDB below the 7 GB of the GitHub runner; the dedup spills to disk beyond that.
+# --release writes RELEASE_LAYOUT and RELEASE_ARTIFACTS of create_monthly_data_release.py,
+# the same as scripts/rebuild_months.py.
+uv run python scripts/create_monthly_data_release.py "$YEAR" "$MONTH_NO_ZERO" --memory-limit 4GB --release \
+    ${PARSE_CACHE_DIR:+--cache-dir "$PARSE_CACHE_DIR"}
 
-echo "Uploading $DATA_FILE..."
-uv run --with "huggingface_hub[cli]" hf upload "$REPO_ID" "$DATA_FILE" "$DATA_FILE" \
+# All artifacts of the month go up in a single Hugging Face commit. The include patterns are
+# relative to monthly_processed_data/ and only match this month, not the downloaded prefix sums.
+echo "Uploading the release of $YEAR-$MONTH_PADDED..."
+uv run --with "huggingface_hub[cli]" hf upload "$REPO_ID" monthly_processed_data monthly_processed_data \
     --repo-type=dataset \
+    --include "data-$YEAR-$MONTH_PADDED.parquet" \
+    --include "star_schema/month=$YEAR-$MONTH_PADDED/*" \
+    --include "by_station/month=$YEAR-$MONTH_PADDED/*" \
+    --include "change_history/history-$YEAR-$MONTH_PADDED.parquet" \
+    --include "planned_paths/month=$YEAR-$MONTH_PADDED/*" \
+    --include "segments/segments-$YEAR-$MONTH_PADDED.parquet" \
+    --include "ride_index/rides-$YEAR-$MONTH_PADDED.parquet" \
+    --include "board_index/boards-$YEAR-$MONTH_PADDED.parquet" \
+    --include "daily_aggregates/prefix-sums-$YEAR-$MONTH_PADDED.parquet" \
+    --include "sketches/sketches-$YEAR-$MONTH_PADDED.parquet" \
+    --include "stats_cube/cube-$YEAR-$MONTH_PADDED.parquet" \
+    --include "stats_cube/trains-$YEAR-$MONTH_PADDED.parquet" \
     --commit-message="Monthly data release for $YEAR-$MONTH_PADDED - $(date -u +"%Y-%m-%d %H:%M:%S UTC")"
 
 echo "=== Done $YEAR-$MONTH_PADDED ==="
@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import duckdb
+from aiohttp import web
+
+STATS_COLUMNS = """
+    CAST(count(*) AS BIGINT) AS stops,
+    avg(CAST(is_canceled AS INTEGER)) AS canceled_rate,
+    avg(delay_in_min) FILTER (NOT is_canceled) AS mean_delay_in_min,
+    avg(CAST(delay_in_min < 6 AS INTEGER)) FILTER (NOT is_canceled) AS punctual_rate
+"""
+
+TIME_RANGE = "time >= $start AND time < $end"
+
+# Fixed SQL per endpoint, executed with bound parameters
+STATEMENTS = {
+    "stations": """
+        SELECT eva, arg_max(station_name, time) AS station_name, CAST(count(*) AS BIGINT) AS stops
+        FROM release
+        GROUP BY eva
+        ORDER BY stops DESC
+    """,
+    "station": f"""
+        SELECT CASE WHEN GROUPING(train_type) = 1 THEN 'Alle' ELSE train_type END AS train_type, {STATS_COLUMNS}
+        FROM release
+        WHERE eva = $key AND {TIME_RANGE}
+        GROUP BY ROLLUP (train_type)
+        ORDER BY stops DESC
+    """,
+    "train": f"""
+        SELECT station_name, eva, {STATS_COLUMNS}, CAST(median(train_line_station_num) AS INTEGER) AS station_num
+        FROM release
+        WHERE train_number = $key AND {TIME_RANGE}
+        GROUP BY station_name, eva
+        ORDER BY station_num, station_name
+    """,
+    "line": f"""
+        SELECT station_name, eva, {STATS_COLUMNS}
+        FROM release
+        WHERE line_number = $key AND {TIME_RANGE}
+        GROUP BY station_name, eva
+        ORDER BY stops DESC
+    """,
+    "daily": f"""
+        SELECT strftime(CAST(time AS DATE), '%Y-%m-%d') AS date, {STATS_COLUMNS}
+        FROM release
+        WHERE {TIME_RANGE}
+        GROUP BY date
+        ORDER BY date
+    """,
+}
+
+
+class QueryEngine:
+    """Runs the endpoint statements on a pool of DuckDB cursors over all monthly files, with an LRU result cache.
+
+    The set of monthly files is checked before every query. When a file appears, changes or disappears,
+    the release view is recreated and the cache is cleared. Identical queries that arrive while one is
+    running share its result.
+    """
+
+    def __init__(self, data_dir: Path, pool_size: int = 4, cache_size: int = 1024, memory_limit: str | None = None):
+        self.data_dir = Path(data_dir)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.in_flight = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.lock = threading.Lock()
+
+        self.con = duckdb.connect()
+        if memory_limit:
+            self.con.execute(f"SET memory_limit = '{memory_limit}'")
+        self.pool = queue.Queue()
+        for _ in range(pool_size):
+            self.pool.put(self.con.cursor())
+
+        self.data_version = None
+        self.refresh()
+
+    def get_data_version(self) -> tuple:
+        return tuple(
+            (path.name, path.stat().st_mtime_ns, path.stat().st_size)
+            for path in sorted(self.data_dir.glob("data-*.parquet"))
+        )
+
+    def refresh(self) -> bool:
+        """Recreate the release view and clear the cache if the monthly files changed."""
+        data_version = self.get_data_version()
+        if data_version == self.data_version:
+            return False
+        with self.lock:
+            if data_version == self.data_version:
+                return False
+            files = [str(self.data_dir / name) for name, _, _ in data_version]
+            if files:
+                self.con.execute(f"CREATE OR REPLACE VIEW release AS SELECT * FROM read_parquet({files})")
+            self.cache.clear()
+            self.data_version = data_version
+        print(f"Serving {len(files)} monthly files from {self.data_dir}")
+        return True
+
+    def _execute(self, statement: str, params: dict) -> list[dict]:
+        cursor = self.pool.get()
+        try:
+            result = cursor.execute(STATEMENTS[statement], params or None)
+            columns = [column[0] for column in result.description]
+            return [dict(zip(columns, row, strict=True)) for row in result.fetchall()]
+        finally:
+            self.pool.put(cursor)
+
+    async def query(self, statement: str, params: dict | None = None) -> list[dict]:
+        # Checking the files and recreating the view block, so they run next to the event loop like the queries
+        await asyncio.to_thread(self.refresh)
+        if not self.data_version:
+            raise web.HTTPServiceUnavailable(text=f"No monthly files in {self.data_dir}")
+        data_version = self.data_version
+        key = (statement, tuple(sorted((params or {}).items())))
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.cache_hits += 1
+                return self.cache[key]
+
+        # Identical concurrent queries wait for the same execution
+        task = self.in_flight.get(key)
+        if task is not None:
+            return await asyncio.shield(task)
+        self.cache_misses += 1
+        task = asyncio.ensure_future(asyncio.to_thread(self._execute, statement, params))
+        self.in_flight[key] = task
+
+        # The query stays in flight until its result is cached, so no identical query runs in between
+        try:
+            rows = await asyncio.shield(task)
+            with self.lock:
+                # Results of a query that ran while the files changed are not cached
+                if data_version != self.data_version:
+                    return rows
+                self.cache[key] = rows
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            return rows
+        finally:
+            self.in_flight.pop(key, None)
+
+
+ENGINE = web.AppKey("engine", QueryEngine)
+
+
+def get_time_range(request: web.Request) -> dict:
+    """The start and end query parameters as an inclusive date range (default: all data)."""
+    try:
+        start = date.fromisoformat(request.query.get("start", "1970-01-01"))
+        end = date.fromisoformat(request.query.get("end", "2099-12-31"))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=f"start and end have to be dates like 2025-07-01: {e}") from e
+    return {
+        "start": datetime.combine(start, datetime.min.time()),
+        "end": datetime.combine(end + timedelta(days=1), datetime.min.time()),
+    }
+
+
+def to_json(rows: list[dict]) -> list[dict]:
+    return [
+        {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()} for row in rows
+    ]
+
+
+def get_query_handler(statement: str):
+    """Handler that runs a statement with the time range and the key from the URL as parameters."""
+
+    async def handle_query(request: web.Request) -> web.Response:
+        engine: QueryEngine = request.app[ENGINE]
+        params = get_time_range(request) if "$start" in STATEMENTS[statement] else {}
+        if "key" in request.match_info:
+            params["key"] = request.match_info["key"]
+
+        start_time = time.perf_counter()
+        rows = await engine.query(statement, params)
+        query_time_ms = (time.perf_counter() - start_time) * 1000
+        return web.json_response(to_json(rows), headers={"X-Query-Time-Ms": f"{query_time_ms:.2f}"})
+
+    return handle_query
+
+
+async def handle_cache(request: web.Request) -> web.Response:
+    engine: QueryEngine = request.app[ENGINE]
+    return web.json_response(
+        {
+            "files": [name for name, _, _ in engine.data_version],
+            "cached_results": len(engine.cache),
+            "hits": engine.cache_hits,
+            "misses": engine.cache_misses,
+        }
+    )
+
+
+def create_app(engine: QueryEngine) -> web.Application:
+    app = web.Application()
+    app[ENGINE] = engine
+    app.router.add_get("/stations", get_query_handler("stations"))
+    app.router.add_get("/stations/{key}", get_query_handler("station"))
+    app.router.add_get("/trains/{key}", get_query_handler("train"))
+    app.router.add_get("/lines/{key}", get_query_handler("line"))
+    app.router.add_get("/daily", get_query_handler("daily"))
+    app.router.add_get("/cache", handle_cache)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve station, train, line and daily statistics of the monthly data")
+    parser.add_argument("--data-dir", type=Path, default=Path("monthly_processed_data"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool-size", type=int, default=4, help="Number of pooled DuckDB cursors")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Number of cached query results")
+    parser.add_argument("--memory-limit", default=None, help="DuckDB memory limit, e.g. '4GB'")
+    args = parser.parse_args()
+
+    engine = QueryEngine(args.data_dir, args.pool_size, args.cache_size, args.memory_limit)
+    web.run_app(create_app(engine), host=args.host, port=args.port)
@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import duckdb
+from create_monthly_data_release import (
+    FIRST_MONTH,
+    RELEASE_ARTIFACTS,
+    RELEASE_LAYOUT,
+    get_parquet_files,
+    main,
+    parse_raw_file_cached,
+    write_daily_prefix_sums,
+)
+
+SIZE_UNITS = {"KB": 1000, "MB": 1000**2, "GB": 1000**3, "TB": 1000**4, "KIB": 1024, "MIB": 1024**2, "GIB": 1024**3}
+
+
+def month_range(start: str, end: str) -> list[tuple[int, int]]:
+    """Return all (year, month) tuples from start to end (inclusive), both given as YYYY-MM."""
+    start_year, start_month = (int(part) for part in start.split("-"))
+    end_year, end_month = (int(part) for part in end.split("-"))
+    if (start_year, start_month) > (end_year, end_month):
+        raise ValueError(f"start {start} is after end {end}")
+
+    months = []
+    year, month = start_year, start_month
+    while (year, month) <= (end_year, end_month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def parse_size(size: str) -> int:
+    """Parse a DuckDB style size like '4GB' or '512MiB' into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]I?B)\s*", size.upper())
+    if not match:
+        raise ValueError(f"invalid size '{size}', expected e.g. '4GB'")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def get_worker_count(memory_budget: str, memory_per_month: str, max_workers: int | None = None) -> int:
+    """Number of months that can be processed at once without the sum of their memory limits exceeding the budget."""
+    workers = max(1, parse_size(memory_budget) // parse_size(memory_per_month))
+    return min(workers, max_workers or os.cpu_count() or 1)
+
+
+def collect_raw_files(months: list[tuple[int, int]]) -> tuple[dict[tuple[int, int], list[Path]], list[Path]]:
+    """Return the raw files of every month and the deduplicated union, so shared boundary days appear once."""
+    files_per_month = {(year, month): get_parquet_files(year, month) for year, month in months}
+    unique_files = list(dict.fromkeys(path for files in files_per_month.values() for path in files))
+    return files_per_month, unique_files
+
+
+def _process_month(
+    year, month, parquet_files, eva_to_station, output_dir, threads, memory_limit, cache_dir, cache_entries
+):
+    start_time = time.time()
+    main(
+        year,
+        month,
+        parquet_files,
+        eva_to_station,
+        output_dir=output_dir,
+        threads=threads,
+        memory_limit=memory_limit,
+        cache_dir=cache_dir,
+        layout=RELEASE_LAYOUT,
+        cache_entries=cache_entries,
+        **RELEASE_ARTIFACTS,
+    )
+    return time.time() - start_time
+
+
+def rebuild_months(
+    months: list[tuple[int, int]],
+    eva_to_station: dict[str, str],
+    output_dir: Path,
+    cache_dir: Path,
+    memory_budget: str,
+    memory_per_month: str,
+    max_workers: int | None = None,
+    daily_aggregates: bool = False,
+    first_month: tuple[int, int] = FIRST_MONTH,
+) -> dict[str, float]:
+    """Rebuild several months in parallel and return the processing time per month.
+
+    Every month is written with the layout and artifacts of the published release (RELEASE_LAYOUT and
+    RELEASE_ARTIFACTS). All raw files are parsed into the shared parse cache first, each exactly once, so
+    a day on a month boundary is parsed once and reused by both neighbouring months. The merge gets the
+    cache entries of the parse, so the raw files are not hashed again. The daily prefix sums carry
+    over from month to month, so they are written one month after the other at the end, starting from the
+    prefix sums of the month before the range unless it starts at first_month.
+    """
+    start_time = time.time()
+    workers = get_worker_count(memory_budget, memory_per_month, max_workers)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    files_per_month, unique_files = collect_raw_files(months)
+    print(f"Rebuilding {len(months)} months from {len(unique_files)} raw files with {workers} workers")
+
+    # Parse every raw file once into the shared cache
+    parse_start_time = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(parse_raw_file_cached, path, cache_dir): path for path in unique_files}
+        cache_entries, reused_count = {}, 0
+        for future in as_completed(futures):
+            entry_dir, reused = future.result()
+            cache_entries[futures[future]] = entry_dir
+            reused_count += reused
+    print(
+        f"Parsed {len(unique_files) - reused_count} raw files ({reused_count} cached) in {time.time() - parse_start_time:.2f} seconds"
+    )
+
+    # Merge the months, each with its share of the memory budget
+    timings = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _process_month,
+                year,
+                month,
+                files,
+                eva_to_station,
+                output_dir,
+                threads,
+                memory_per_month,
+                cache_dir,
+                {path: cache_entries[path] for path in files},
+            ): f"{year}-{month:02d}"
+            for (year, month), files in files_per_month.items()
+        }
+        for future in as_completed(futures):
+            timings[futures[future]] = future.result()
+
+    if daily_aggregates:
+        con = duckdb.connect()
+        for year, month in sorted(months):
+            write_daily_prefix_sums(
+                con, output_dir / f"data-{year}-{month:02d}.parquet", output_dir, year, month, first_month
+            )
+        con.close()
+        print(f"Saved daily prefix sums of {len(months)} months")
+
+    print("Processing time per month:")
+    for ym, seconds in sorted(timings.items()):
+        print(f"  {ym}: {seconds:.2f} seconds")
+    print(f"Total wall time: {time.time() - start_time:.2f} seconds")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the monthly releases of a month range in parallel")
+    parser.add_argument("start", help="First month, YYYY-MM")
+    parser.add_argument("end", help="Last month (inclusive), YYYY-MM")
+    parser.add_argument("--memory-budget", default="12GB", help="Total memory all parallel months may use")
+    parser.add_argument("--memory-per-month", default="4GB", help="DuckDB memory limit of a single month")
+    parser.add_argument("--max-workers", type=int, default=None, help="Upper bound of parallel months")
+    parser.add_argument("--cache-dir", type=Path, default=Path("parse_cache"))
+    parser.add_argument(
+        "--daily-aggregates", action="store_true", help="Also rewrite the daily prefix sums of the months in order"
+    )
+    args = parser.parse_args()
+
+    eva_to_station = json.load(open("config/eva_to_station_name.json"))
+    rebuild_months(
+        month_range(args.start, args.end),
+        eva_to_station,
+        output_dir=Path("monthly_processed_data"),
+        cache_dir=args.cache_dir,
+        memory_budget=args.memory_budget,
+        memory_per_month=args.memory_per_month,
+        max_workers=args.max_workers,
+        daily_aggregates=args.daily_aggregates,
+    )
@@ -0,0 +1,136 @@
+import argparse
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+
+def get_ride_index_file(release_file: Path) -> Path:
+    """Ride index written next to a release file by create_monthly_data_release.py --ride-index."""
+    month = Path(release_file).stem.removeprefix("data-")
+    return Path(release_file).parent / "ride_index" / f"rides-{month}.parquet"
+
+
+def get_board_index_file(release_file: Path) -> Path:
+    """Board index written next to a release file by create_monthly_data_release.py --board-index."""
+    month = Path(release_file).stem.removeprefix("data-")
+    return Path(release_file).parent / "board_index" / f"boards-{month}.parquet"
+
+
+def get_release_files(release_dir: Path, start: datetime, end: datetime) -> list[Path]:
+    """Existing monthly release files in release_dir that overlap the time range."""
+    months = pd.period_range(start, end, freq="M")
+    release_files = [Path(release_dir) / f"data-{month.strftime('%Y-%m')}.parquet" for month in months]
+    return [release_file for release_file in release_files if release_file.exists()]
+
+
+def read_row_groups(release_file: Path, row_groups: list[int], column: str, values: list) -> pa.Table:
+    """Read only the given row groups of a release file and keep the rows where column is one of values."""
+    if not row_groups:
+        return pq.read_schema(release_file).empty_table()
+    table = pq.ParquetFile(release_file).read_row_groups(sorted(set(row_groups)))
+    return table.filter(pc.is_in(table[column], value_set=pa.array(values, type=table.schema.field(column).type)))
+
+
+def concat_stops(release_files: list[Path], tables: list[pa.Table]) -> pd.DataFrame:
+    """Concatenate the stops read from the release files, with the release columns even if there are none."""
+    schema = pq.read_schema(release_files[0])
+    return pa.concat_tables([schema.empty_table(), *tables]).to_pandas()
+
+
+def lookup_rides(release_files: list[Path], filters: list[tuple]) -> pd.DataFrame:
+    """Return all stops of the rides in the ride indexes matching the pyarrow filters, sorted by ride and stop.
+
+    Months without a ride index are read with the filters instead, which is slower but finds the same rides.
+    """
+    if not release_files:
+        return pd.DataFrame()
+    tables = []
+    for release_file in release_files:
+        index_file = get_ride_index_file(release_file)
+        if not index_file.exists():
+            tables.append(pq.read_table(release_file, filters=filters))
+            continue
+        index = pq.read_table(index_file, filters=filters)
+        ride_ids = index["train_line_ride_id"].to_pylist()
+        row_groups = [row_group for groups in index["row_groups"].to_pylist() for row_group in groups]
+        tables.append(read_row_groups(release_file, row_groups, "train_line_ride_id", ride_ids))
+
+    stops = concat_stops(release_files, tables)
+    return stops.sort_values(["train_line_ride_id", "train_line_station_num"]).reset_index(drop=True)
+
+
+def get_ride(train_line_ride_id: str, release_files: list[Path]) -> pd.DataFrame:
+    """Return all stops of one ride, reading only the row groups that contain it."""
+    return lookup_rides(release_files, [("train_line_ride_id", "==", train_line_ride_id)])
+
+
+def get_train_number_rides(train_number: str, release_files: list[Path], train_type: str | None = None) -> pd.DataFrame:
+    """Return all stops of all rides with a train number, e.g. get_train_number_rides("123", files, "ICE")."""
+    filters = [("train_number", "==", train_number)]
+    if train_type is not None:
+        filters.append(("train_type", "==", train_type))
+    return lookup_rides(release_files, filters)
+
+
+def get_board(
+    eva: str, start: datetime, end: datetime, release_dir: Path = Path("monthly_processed_data")
+) -> pd.DataFrame:
+    """Return all stops at a station between start (inclusive) and end (exclusive), sorted by time.
+
+    Only the row groups listed in the board index for the hours of the range are read, so the cost
+    depends on the length of the range and not on the size of the monthly files. Months without a board
+    index are read with filters on eva and time instead.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    release_files = get_release_files(release_dir, start, end)
+    if not release_files:
+        return pd.DataFrame()
+    tables = []
+    for release_file in release_files:
+        index_file = get_board_index_file(release_file)
+        if not index_file.exists():
+            filters = [("eva", "==", eva), ("time", ">=", start), ("time", "<", end)]
+            tables.append(pq.read_table(release_file, filters=filters))
+            continue
+        filters = [("eva", "==", eva), ("hour", ">=", start.floor("h")), ("hour", "<", end)]
+        index = pq.read_table(index_file, filters=filters)
+        row_groups = [row_group for groups in index["row_groups"].to_pylist() for row_group in groups]
+        tables.append(read_row_groups(release_file, row_groups, "eva", [eva]))
+
+    stops = concat_stops(release_files, tables)
+    stops = stops[(stops["time"] >= start) & (stops["time"] < end)]
+    return stops.sort_values("time").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up rides or station boards in the monthly releases")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ride_parser = subparsers.add_parser("ride", help="All stops of a ride or of all rides of a train number")
+    ride_parser.add_argument("release_files", type=Path, nargs="+", help="Monthly release files with a ride index")
+    group = ride_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--ride-id", help="train_line_ride_id of a single ride")
+    group.add_argument("--train-number", help="Train number of all rides to return")
+    ride_parser.add_argument("--train-type", default=None, help="Only rides of this train type, e.g. ICE")
+
+    board_parser = subparsers.add_parser("board", help="All stops at a station in a time range")
+    board_parser.add_argument("eva", help="EVA number of the station, e.g. 08000105")
+    board_parser.add_argument("start", type=datetime.fromisoformat, help="Start time, e.g. 2025-07-01T17:00")
+    board_parser.add_argument("end", type=datetime.fromisoformat, help="End time (exclusive), e.g. 2025-07-01T19:00")
+    board_parser.add_argument("--release-dir", type=Path, default=Path("monthly_processed_data"))
+    args = parser.parse_args()
+
+    start_time = time.time()
+    if args.command == "board":
+        stops = get_board(args.eva, args.start, args.end, args.release_dir)
+    elif args.ride_id:
+        stops = get_ride(args.ride_id, args.release_files)
+    else:
+        stops = get_train_number_rides(args.train_number, args.release_files, args.train_type)
+    print(stops.to_string(index=False))
+    print(f"Found {len(stops):_} stops in {time.time() - start_time:.3f} seconds")
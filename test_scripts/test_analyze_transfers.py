@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from scripts.analyze_transfers import analyze_transfers, get_station_connections
+
+
+def make_stops(n, seed=0):
+    rng = np.random.default_rng(seed)
+    planned = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 24 * 60, n), unit="m")
+    delay = pd.to_timedelta(rng.integers(0, 10, n), unit="m")
+    has_arrival = rng.random(n) < 0.8
+    has_departure = rng.random(n) < 0.8
+    return pd.DataFrame(
+        {
+            "eva": "08000105",
+            "station_name": "Frankfurt (Main) Hbf",
+            "time": planned,
+            "train_line_ride_id": [f"ride-{i % (n // 2)}" for i in range(n)],
+            "train_type": rng.choice(["ICE", "RE", "S"], n),
+            "arrival_planned_time": planned.where(has_arrival),
+            "arrival_change_time": (planned + delay).where(has_arrival),
+            "departure_planned_time": (planned + pd.Timedelta(minutes=2)).where(has_departure),
+            "departure_change_time": (planned + pd.Timedelta(minutes=2) + delay).where(has_departure),
+            "is_canceled": rng.random(n) < 0.05,
+        }
+    )
+
+
+def test_station_connections_match_a_naive_join():
+    stops = make_stops(400)
+    connections = get_station_connections(stops, min_transfer_in_min=2, max_transfer_in_min=15)
+
+    pairs = stops.merge(stops, how="cross", suffixes=("_arr", "_dep"))
+    planned = (pairs["departure_planned_time_dep"] - pairs["arrival_planned_time_arr"]).dt.total_seconds() / 60
+    pairs = pairs[planned.between(2, 15) & (pairs["train_line_ride_id_arr"] != pairs["train_line_ride_id_dep"])]
+    actual = (pairs["departure_change_time_dep"] - pairs["arrival_change_time_arr"]).dt.total_seconds() / 60
+    broken = pairs["is_canceled_arr"] | pairs["is_canceled_dep"] | (actual < 2)
+
+    assert len(connections) == len(pairs)
+    assert connections["is_broken"].sum() == broken.sum()
+
+
+def test_analyze_transfers_counts_per_train_type_pair(tmp_path):
+    release_file = tmp_path / "data.parquet"
+    make_stops(200).to_parquet(release_file, index=False)
+
+    result = analyze_transfers(release_file)
+
+    connections = get_station_connections(make_stops(200))
+    assert result["planned_connections"].sum() == len(connections)
+    assert result["broken_connections"].sum() == connections["is_broken"].sum()
+    assert set(result["arrival_train_type"]) <= {"ICE", "RE", "S"}
+
+
+def test_analyze_transfers_groups_stations_by_eva(tmp_path):
+    release_file = tmp_path / "data.parquet"
+    stops = make_stops(200)
+    # The station was renamed within the month
+    stops["station_name"] = stops["station_name"].where(stops["time"] < "2025-01-01 12:00", "Frankfurt Hbf")
+    stops.to_parquet(release_file, index=False)
+
+    result = analyze_transfers(release_file, evas=["08000105"])
+
+    assert set(result["station_name"]) == {"Frankfurt Hbf"}
+    assert result["planned_connections"].sum() == len(get_station_connections(stops))
+
+    missing = analyze_transfers(release_file, evas=["08000001' OR '1'='1"])
+    assert missing.empty
+    assert "broken_share" in missing.columns
+
+
+def test_analyze_transfers_reads_the_stations_in_batches(tmp_path):
+    release_file = tmp_path / "data.parquet"
+    stations = []
+    for i, eva in enumerate(["08000105", "08000191", "08000261"]):
+        stops = make_stops(200, seed=i)
+        stops["eva"] = eva
+        stations.append(stops)
+    pd.concat(stations).to_parquet(release_file, index=False)
+
+    result = analyze_transfers(release_file)
+    batched = analyze_transfers(release_file, stations_per_query=2)
+
+    pd.testing.assert_frame_equal(batched, result)
+    assert result["eva"].unique().tolist() == ["08000105", "08000191", "08000261"]
+    for eva, stops in zip(["08000105", "08000191", "08000261"], stations):
+        assert result.loc[result["eva"] == eva, "planned_connections"].sum() == len(get_station_connections(stops))
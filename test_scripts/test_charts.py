@@ -0,0 +1,49 @@
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from notebooks.src.charts import get_chart, write_chart
+
+
+def test_write_chart_writes_compact_series(tmp_path):
+    series = {
+        "Alle": pd.Series([1.23456, np.nan], index=[date(2025, 7, 1), date(2025, 7, 2)]),
+        "ICE": pd.Series([np.int64(12345)], index=[date(2025, 7, 1)]),
+    }
+
+    path = write_chart(
+        tmp_path / "tag" / "delays.json",
+        "line",
+        series,
+        title="Durchschnittliche Verspätung",
+        x_label="Tag",
+        y_label="Minuten",
+        x_ticks=[date(2025, 7, 1)],
+        markers=True,
+    )
+
+    figure = json.loads(path.read_text())
+    assert [(trace["type"], trace["mode"], trace["name"], trace["x"], trace["y"]) for trace in figure["data"]] == [
+        ("scatter", "lines+markers", "Alle", ["2025-07-01", "2025-07-02"], [1.235, None]),
+        ("scatter", "lines+markers", "ICE", ["2025-07-01"], [12345]),
+    ]
+    layout = figure["layout"]
+    assert layout["title"]["text"] == "Durchschnittliche Verspätung"
+    assert layout["xaxis"]["title"]["text"] == "Tag"
+    assert layout["xaxis"]["tickvals"] == ["2025-07-01"]
+    assert layout["yaxis"]["title"]["text"] == "Minuten"
+
+
+def test_chart_is_a_valid_plotly_figure():
+    series = {"ICE": pd.Series([92.5, 88.0], index=["Mo", "Di"]), "RE": pd.Series([95.0, 91.5], index=["Mo", "Di"])}
+
+    chart = get_chart("bar", series, "Pünktlichkeit", "Tag", "Prozent (%)", y_format="percent", y_range=(0, 100))
+
+    figure = go.Figure(chart)
+    assert [trace.type for trace in figure.data] == ["bar", "bar"]
+    assert figure.layout.barmode == "group"
+    assert figure.layout.yaxis.ticksuffix == "%"
+    assert figure.layout.yaxis.range == (0, 100)
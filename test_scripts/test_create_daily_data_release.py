@@ -0,0 +1,37 @@
+from datetime import date
+
+import duckdb
+import pandas as pd
+
+from scripts.create_daily_data_release import get_daily_release_query, main
+from test_scripts.test_create_monthly_data_release import assert_output_matches, write_input_parquet
+
+
+def test_daily_release_upserts_by_id(tmp_path):
+    eva_to_station = {"08000105": "Frankfurt (Main) Hbf"}
+    output_dir = tmp_path / "daily"
+
+    first_day_file = write_input_parquet("test_scripts/test_data/valid_input.csv", tmp_path)
+    main(date(2025, 1, 15), [first_day_file], eva_to_station, output_dir=output_dir)
+
+    first_delta = output_dir / "month=2025-01" / "delta-2025-01-15.parquet"
+    assert_output_matches(first_delta, "test_scripts/test_data/valid_expected.csv")
+
+    # A change fetched after midnight only updates the stop it mentions
+    second_day_df = pd.read_parquet(first_day_file).iloc[[1]].copy()
+    second_day_df["timestamp"] = pd.Timestamp("2025-01-16 00:30:00")
+    second_day_df["response_data"] = (
+        '<?xml version="1.0" ?><timetable station="Frankfurt (Main) Hbf" eva="08000105">'
+        '<s id="123456789-2501151000-1"><dp ct="2501151045"/></s></timetable>'
+    )
+    second_day_file = tmp_path / "second_day.parquet"
+    second_day_df.to_parquet(second_day_file, index=False)
+    main(date(2025, 1, 16), [second_day_file], eva_to_station, output_dir=output_dir)
+
+    second_delta = pd.read_parquet(output_dir / "month=2025-01" / "delta-2025-01-16.parquet")
+    assert second_delta["id"].tolist() == ["123456789-2501151000-1"]
+
+    current = duckdb.sql(get_daily_release_query(output_dir / "month=2025-01")).df().set_index("id")
+    assert len(current) == 2
+    assert current.loc["123456789-2501151000-1", "delay_in_min"] == 25
+    assert current.loc["-7654321000000000001-2501151030-2", "delay_in_min"] == 10
@@ -1,7 +1,9 @@
+import duckdb
 import pandas as pd
 import pytest
 
-from scripts.create_monthly_data_release import main
+import scripts.create_monthly_data_release as release
+from scripts.create_monthly_data_release import ReleaseLayout, main
 
 
 @pytest.mark.parametrize(
@@ -14,7 +16,23 @@ from scripts.create_monthly_data_release import main
 def test_main(tmp_path, input_csv_path, expected_csv_path, year, month):
     """End-to-end test for the main function of create_monthly_data_release.py"""
 
-    # Load input CSV with proper dtypes and save it as parquet
+    test_parquet_file = write_input_parquet(input_csv_path, tmp_path)
+
+    # Create minimal eva_to_station dict with only what's needed for the test
+    eva_to_station = {"08000105": "Frankfurt (Main) Hbf"}
+
+    # Run main with test data
+    main(year, month, [test_parquet_file], eva_to_station, output_dir=tmp_path)
+
+    # Load the output
+    output_file = tmp_path / f"data-{year}-{month:02d}.parquet"
+    assert output_file.exists(), f"Output file {output_file} was not created"
+
+    assert_output_matches(output_file, expected_csv_path)
+
+
+def write_input_parquet(input_csv_path, tmp_path):
+    """Load input CSV with proper dtypes and save it as parquet"""
     input_df = pd.read_csv(
         input_csv_path,
         dtype={
@@ -33,17 +51,10 @@ def test_main(tmp_path, input_csv_path, expected_csv_path, year, month):
     )
     test_parquet_file = tmp_path / "test_data.parquet"
     input_df.to_parquet(test_parquet_file, index=False)
+    return test_parquet_file
 
-    # Create minimal eva_to_station dict with only what's needed for the test
-    eva_to_station = {"08000105": "Frankfurt (Main) Hbf"}
-
-    # Run main with test data
-    main(year, month, [test_parquet_file], eva_to_station, output_dir=tmp_path)
-
-    # Load the output
-    output_file = tmp_path / f"data-{year}-{month:02d}.parquet"
-    assert output_file.exists(), f"Output file {output_file} was not created"
 
+def assert_output_matches(output_file, expected_csv_path):
     output_df = pd.read_parquet(output_file)
 
     # Load expected output with proper dtypes
@@ -81,3 +92,195 @@ def test_main(tmp_path, input_csv_path, expected_csv_path, year, month):
     expected_df = expected_df.where(expected_df.notna(), other=None)
 
     pd.testing.assert_frame_equal(output_df, expected_df)
+
+
+def test_release_completes_without_the_previous_prefix_sums(tmp_path):
+    test_parquet_file = write_input_parquet("test_scripts/test_data/valid_input.csv", tmp_path)
+
+    main(2025, 1, [test_parquet_file], {"08000105": "Frankfurt (Main) Hbf"}, output_dir=tmp_path, daily_aggregates=True)
+
+    assert_output_matches(tmp_path / "data-2025-01.parquet", "test_scripts/test_data/valid_expected.csv")
+    prefix_sums_file = tmp_path / "daily_aggregates" / "prefix-sums-2025-01.parquet"
+    assert release.get_prefix_sums_chain_start(duckdb.connect(), prefix_sums_file) == "2025-01"
+
+
+def test_main_reuses_parse_cache(tmp_path, monkeypatch):
+    test_parquet_file = write_input_parquet("test_scripts/test_data/valid_input.csv", tmp_path)
+    eva_to_station = {"08000105": "Frankfurt (Main) Hbf"}
+    cache_dir = tmp_path / "parse_cache"
+
+    main(2025, 1, [test_parquet_file], eva_to_station, output_dir=tmp_path / "first", cache_dir=cache_dir)
+
+    # A second run must not parse the unchanged raw file again
+    def fail_parse(*args, **kwargs):
+        raise AssertionError("raw file was parsed again")
+
+    monkeypatch.setattr(release, "parse_raw_file", fail_parse)
+    main(2025, 1, [test_parquet_file], eva_to_station, output_dir=tmp_path / "second", cache_dir=cache_dir)
+
+    assert_output_matches(tmp_path / "second" / "data-2025-01.parquet", "test_scripts/test_data/valid_expected.csv")
+
+
+def test_main_writes_release_layout(tmp_path):
+    test_parquet_file = write_input_parquet("test_scripts/test_data/edge_cases_input.csv", tmp_path)
+    layout = ReleaseLayout(row_group_size=65_536, compression_level=9, sort_by=("time", "eva"))
+
+    main(2025, 1, [test_parquet_file], {"08000105": "Frankfurt (Main) Hbf"}, output_dir=tmp_path, layout=layout)
+
+    output_file = tmp_path / "data-2025-01.parquet"
+    compressions = duckdb.sql(f"SELECT list(DISTINCT compression) FROM parquet_metadata('{output_file}')").fetchone()
+    assert compressions == (["ZSTD"],)
+    assert pd.read_parquet(output_file)["time"].is_monotonic_increasing
+    assert_output_matches(output_file, "test_scripts/test_data/edge_cases_expected.csv")
+
+
+def test_star_schema_joins_back_to_release(tmp_path):
+    test_parquet_file = write_input_parquet("test_scripts/test_data/edge_cases_input.csv", tmp_path)
+    layout = ReleaseLayout(sort_by=("date_trunc('day', time)", "eva", "time"))
+
+    main(
+        2025,
+        1,
+        [test_parquet_file],
+        {"08000105": "Frankfurt (Main) Hbf"},
+        output_dir=tmp_path,
+        layout=layout,
+        star_schema=True,
+    )
+
+    star_dir = tmp_path / "star_schema" / "month=2025-01"
+    facts_types = {
+        row[0]: row[1] for row in duckdb.sql(f"DESCRIBE SELECT * FROM '{star_dir / 'facts.parquet'}'").fetchall()
+    }
+    assert facts_types["station_id"] == facts_types["train_type_id"] == facts_types["destination_id"] == "INTEGER"
+
+    joined = duckdb.sql(f"""
+        SELECT s.station_name, s.eva, t.train_type, d.final_destination_station, f.id
+        FROM '{star_dir / "facts.parquet"}' f
+        JOIN '{star_dir / "stations.parquet"}' s USING (station_id)
+        JOIN '{star_dir / "train_types.parquet"}' t USING (train_type_id)
+        JOIN '{star_dir / "destinations.parquet"}' d USING (destination_id)
+        ORDER BY f.id
+    """).df()
+    release = pd.read_parquet(tmp_path / "data-2025-01.parquet").sort_values("id").reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        joined, release[["station_name", "eva", "train_type", "final_destination_station", "id"]], check_dtype=False
+    )
+
+
+def test_station_partitions_put_all_evas_of_a_station_in_one_bucket(tmp_path):
+    test_parquet_file = write_input_parquet("test_scripts/test_data/valid_input.csv", tmp_path)
+    second_eva_df = pd.read_parquet(test_parquet_file)
+    second_eva_df["url"] = second_eva_df["url"].str.replace("08000105", "08098105")
+    second_eva_df["response_data"] = second_eva_df["response_data"].str.replace("2501151", "2501152")
+    second_eva_file = tmp_path / "second_eva.parquet"
+    second_eva_df.to_parquet(second_eva_file, index=False)
+    eva_to_station = {"08000105": "Frankfurt (Main) Hbf", "08098105": "Frankfurt (Main) Hbf"}
+
+    main(2025, 1, [test_parquet_file, second_eva_file], eva_to_station, output_dir=tmp_path, station_partitions=True)
+
+    station_dir = tmp_path / "by_station" / "month=2025-01"
+    stations = pd.read_parquet(station_dir / "stations.parquet")
+    assert stations["eva"].tolist() == ["08000105", "08098105"]
+    assert stations["bucket"].tolist() == [8000105 % 64] * 2
+
+    bucket_df = pd.read_parquet(station_dir / f"bucket={8000105 % 64}" / "data0.parquet")
+    assert len(bucket_df) == 4
+    assert bucket_df["eva"].is_monotonic_increasing
+
+
+def test_change_history_collapses_repeated_observations():
+    fchg = pd.DataFrame(
+        {
+            "id": ["a-2501011000-1"] * 4,
+            "xml_timestamp": pd.to_datetime(
+                ["2025-01-01 08:00", "2025-01-01 09:00", "2025-01-01 09:30", "2025-01-01 09:50"]
+            ),
+            "arrival_change_time": pd.to_datetime([None, None, "2025-01-01 10:05", "2025-01-01 10:05"]),
+            "departure_change_time": pd.to_datetime([None, None, "2025-01-01 10:06", "2025-01-01 10:06"]),
+            "is_canceled": [None, None, None, True],
+        }
+    )
+    release_df = pd.DataFrame(
+        {
+            "id": ["a-2501011000-1"],
+            "arrival_planned_time": pd.to_datetime(["2025-01-01 10:00"]),
+            "departure_planned_time": pd.to_datetime(["2025-01-01 10:01"]),
+        }
+    )
+
+    con = duckdb.connect()
+    con.register("fchg", fchg)
+    con.register("release_df", release_df)
+    history = con.sql(release.get_change_history_query("fchg", "release_df")).df()
+
+    assert history["change_num"].tolist() == [1, 2, 3]
+    assert history["repeat_count"].tolist() == [2, 1, 1]
+    assert history["observed_offset_in_min"].tolist() == [-121, -31, -11]
+    assert history["arrival_delay_in_min"].tolist()[1:] == [5, 5]
+    assert history["departure_delay_in_min"].tolist()[1:] == [5, 5]
+    assert history["is_canceled"].tolist() == [False, False, True]
+
+
+# The edge cases have no stop with an arrival path
+@pytest.mark.parametrize(
+    "input_csv_path", ["test_scripts/test_data/valid_input.csv", "test_scripts/test_data/edge_cases_input.csv"]
+)
+def test_planned_paths_restore_the_raw_ppth(tmp_path, input_csv_path):
+    test_parquet_file = write_input_parquet(input_csv_path, tmp_path)
+
+    main(2025, 1, [test_parquet_file], {"08000105": "Frankfurt (Main) Hbf"}, output_dir=tmp_path, planned_paths=True)
+
+    paths_dir = tmp_path / "planned_paths" / "month=2025-01"
+    restored = duckdb.sql(f"""
+        WITH paths AS (
+            SELECT p.path_id, string_agg(s.station_name, '|' ORDER BY e.position) AS path
+            FROM '{paths_dir / "paths.parquet"}' p,
+                unnest(p.path_station_ids) WITH ORDINALITY AS e(path_station_id, position)
+            JOIN '{paths_dir / "path_stations.parquet"}' s USING (path_station_id)
+            GROUP BY p.path_id
+        )
+        SELECT sp.id, a.path AS arrival_planned_path, d.path AS departure_planned_path
+        FROM '{paths_dir / "stop_paths.parquet"}' sp
+        LEFT JOIN paths a ON sp.arrival_path_id = a.path_id
+        LEFT JOIN paths d ON sp.departure_path_id = d.path_id
+        ORDER BY sp.id
+    """).df()
+
+    _, plan_df, _ = release.parse_raw_file(test_parquet_file)
+    released_ids = pd.read_parquet(tmp_path / "data-2025-01.parquet")["id"]
+    expected = (
+        plan_df[plan_df["id"].isin(released_ids)][["id", "arrival_planned_path", "departure_planned_path"]]
+        .sort_values("id")
+        .reset_index(drop=True)
+    )
+    pd.testing.assert_frame_equal(restored, expected, check_dtype=False)
+
+
+def test_segments_connect_consecutive_stops_of_a_ride():
+    stops = pd.DataFrame(
+        {
+            "train_line_ride_id": ["r1", "r1", "r1", "r2"],
+            "train_type": ["ICE"] * 4,
+            "line_number": [None] * 4,
+            "train_number": ["1", "1", "1", "2"],
+            "train_line_station_num": [3, 1, 2, 1],
+            "eva": ["C", "A", "B", "A"],
+            "station_name": ["C", "A", "B", "A"],
+            "arrival_planned_time": pd.to_datetime(["2025-01-01 11:00", None, "2025-01-01 10:30", None]),
+            "arrival_change_time": pd.to_datetime(["2025-01-01 11:12", None, "2025-01-01 10:32", None]),
+            "departure_planned_time": pd.to_datetime(
+                [None, "2025-01-01 10:00", "2025-01-01 10:32", "2025-01-01 12:00"]
+            ),
+            "departure_change_time": pd.to_datetime([None, "2025-01-01 10:00", "2025-01-01 10:34", "2025-01-01 12:00"]),
+            "is_canceled": [False, False, False, False],
+        }
+    )
+    con = duckdb.connect()
+    con.register("stops", stops)
+    segments = con.sql(release.get_segments_query("stops")).df()
+
+    assert list(zip(segments["from_eva"], segments["to_eva"])) == [("A", "B"), ("B", "C")]
+    assert segments["planned_travel_time_in_min"].tolist() == [30, 28]
+    assert segments["actual_travel_time_in_min"].tolist() == [32, 38]
+    assert segments["delay_gained_in_min"].tolist() == [2, 10]
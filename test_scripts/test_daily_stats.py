@@ -0,0 +1,97 @@
+from datetime import date
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from notebooks.src.daily_stats import get_range_stats
+from scripts.create_monthly_data_release import write_daily_prefix_sums
+
+
+def write_release(tmp_path, year, month, evas, seed):
+    rng = np.random.default_rng(seed)
+    n = 2000
+    release = pd.DataFrame(
+        {
+            "eva": rng.choice(evas, n),
+            "train_type": rng.choice(["ICE", "RE", None], n),
+            "time": pd.Timestamp(year, month, 1) + pd.to_timedelta(rng.integers(0, 28 * 24 * 60, n), unit="m"),
+            "delay_in_min": rng.integers(-1, 20, n).astype("int32"),
+            "is_canceled": rng.random(n) < 0.1,
+        }
+    )
+    release_file = tmp_path / f"data-{year}-{month:02d}.parquet"
+    release.to_parquet(release_file, index=False)
+    return release
+
+
+def expected_stats(release, start, end, eva=None, train_type=None):
+    days = release["time"].dt.date
+    selected = release[(days >= start) & (days <= end)]
+    if eva is not None:
+        selected = selected[selected["eva"] == eva]
+    if train_type is not None:
+        selected = selected[selected["train_type"] == train_type]
+    not_canceled = selected[~selected["is_canceled"]]
+    return {
+        "stops": len(selected),
+        "canceled_rate": selected["is_canceled"].mean(),
+        "mean_delay_in_min": not_canceled["delay_in_min"].mean(),
+        "punctual_rate": (not_canceled["delay_in_min"] < 6).mean(),
+    }
+
+
+@pytest.mark.parametrize(
+    "start,end,eva,train_type",
+    [
+        (date(2025, 1, 3), date(2025, 1, 17), None, None),
+        (date(2025, 1, 20), date(2025, 2, 10), "A", None),
+        (date(2025, 1, 1), date(2025, 2, 28), None, "ICE"),
+        # Station C only has stops in January, its totals are carried into February
+        (date(2025, 2, 5), date(2025, 2, 20), "C", None),
+        (date(2025, 1, 10), date(2025, 2, 20), "C", "RE"),
+    ],
+)
+def test_range_stats_match_the_stops(tmp_path, start, end, eva, train_type):
+    january = write_release(tmp_path, 2025, 1, ["A", "B", "C"], seed=1)
+    february = write_release(tmp_path, 2025, 2, ["A", "B"], seed=2)
+    con = duckdb.connect()
+    for year, month in [(2025, 1), (2025, 2)]:
+        write_daily_prefix_sums(con, tmp_path / f"data-{year}-{month:02d}.parquet", tmp_path, year, month, (2025, 1))
+
+    stats = get_range_stats(start, end, eva, train_type, aggregates_dir=tmp_path / "daily_aggregates")
+
+    expected = expected_stats(pd.concat([january, february]), start, end, eva, train_type)
+    assert stats["stops"] == expected["stops"]
+    if expected["stops"]:
+        for key in ["canceled_rate", "mean_delay_in_min", "punctual_rate"]:
+            assert stats[key] == pytest.approx(expected[key])
+
+
+def test_range_stats_bind_the_filters(tmp_path):
+    write_release(tmp_path, 2025, 1, ["A", "B"], seed=1)
+    write_daily_prefix_sums(duckdb.connect(), tmp_path / "data-2025-01.parquet", tmp_path, 2025, 1, (2025, 1))
+
+    stats = get_range_stats(
+        date(2025, 1, 1), date(2025, 1, 31), eva="A' OR eva <> '", aggregates_dir=tmp_path / "daily_aggregates"
+    )
+    assert stats["stops"] == 0
+
+
+def test_prefix_sums_restart_without_the_previous_month(tmp_path):
+    february = write_release(tmp_path, 2025, 2, ["A", "B"], seed=2)
+    march = write_release(tmp_path, 2025, 3, ["A", "B"], seed=3)
+    con = duckdb.connect()
+    # January is missing, so February restarts the totals and March continues from there
+    for year, month in [(2025, 2), (2025, 3)]:
+        write_daily_prefix_sums(con, tmp_path / f"data-{year}-{month:02d}.parquet", tmp_path, year, month, (2025, 1))
+    aggregates_dir = tmp_path / "daily_aggregates"
+
+    stats = get_range_stats(date(2025, 2, 1), date(2025, 3, 10), aggregates_dir=aggregates_dir)
+    expected = expected_stats(pd.concat([february, march]), date(2025, 2, 1), date(2025, 3, 10))
+    assert stats["stops"] == expected["stops"]
+    assert stats["mean_delay_in_min"] == pytest.approx(expected["mean_delay_in_min"])
+
+    with pytest.raises(ValueError, match="restart at 2025-02-01"):
+        get_range_stats(date(2025, 1, 20), date(2025, 3, 10), aggregates_dir=aggregates_dir)
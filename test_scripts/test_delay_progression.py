@@ -0,0 +1,32 @@
+import duckdb
+import pandas as pd
+
+from notebooks.src.delay_progression import calculate_delay_progression, get_delay_progression
+
+
+def test_delay_progression_in_pandas_and_duckdb():
+    release = pd.DataFrame(
+        {
+            "train_line_ride_id": ["r1", "r1", "r1", "r2", "r2", None],
+            "time": pd.to_datetime(
+                [
+                    "2025-01-01 10:20",
+                    "2025-01-01 10:00",
+                    "2025-01-01 10:10",
+                    "2025-01-02 08:00",
+                    "2025-01-02 08:10",
+                    "2025-01-02 09:00",
+                ]
+            ),
+            "delay_in_min": [6, 2, 3, 4, 7, 1],
+            "is_canceled": [False, False, False, False, False, False],
+        }
+    )
+    data = release.assign(time_minutes=(release["time"] - pd.Timestamp("2024-01-01")).dt.total_seconds() / 60)
+
+    expected = pd.DataFrame({"time_since_start": [0.0, 10.0], "mean_delay": [3.0, 5.0], "count": [2, 2]})
+    pd.testing.assert_frame_equal(calculate_delay_progression(data, max_time_since_start=15), expected)
+
+    con = duckdb.connect()
+    progression = get_delay_progression(con.from_df(release), max_time_since_start=15)
+    pd.testing.assert_frame_equal(progression, expected, check_dtype=False)
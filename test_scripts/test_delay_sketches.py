@@ -0,0 +1,58 @@
+from datetime import date
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from notebooks.src.delay_sketches import get_delay_distribution, get_delay_quantiles, get_distinct_rides
+from scripts.create_monthly_data_release import write_delay_sketches
+
+
+@pytest.fixture
+def releases(tmp_path):
+    con = duckdb.connect()
+    releases = []
+    for month, seed in [(1, 1), (2, 2)]:
+        rng = np.random.default_rng(seed)
+        n = 20_000
+        release = pd.DataFrame(
+            {
+                "eva": rng.choice(["A", "B", "C"], n),
+                "train_type": rng.choice(["ICE", "RE", None], n),
+                "time": pd.Timestamp(2025, month, 1) + pd.to_timedelta(rng.integers(0, 28 * 24 * 60, n), unit="m"),
+                "delay_in_min": rng.geometric(0.2, n).astype("int32") - 2,
+                "is_canceled": rng.random(n) < 0.05,
+                "train_line_ride_id": [f"ride-{month}-{i}" for i in rng.integers(0, 6000, n)],
+            }
+        )
+        release_file = tmp_path / f"data-2025-{month:02d}.parquet"
+        release.to_parquet(release_file, index=False)
+        write_delay_sketches(con, release_file, tmp_path / "sketches" / f"sketches-2025-{month:02d}.parquet")
+        releases.append(release)
+    return pd.concat(releases, ignore_index=True)
+
+
+def test_merged_delay_sketches_are_exact(tmp_path, releases):
+    sketches_dir = tmp_path / "sketches"
+    selected = releases[(releases["eva"] == "A") & ~releases["is_canceled"] & (releases["time"] >= "2025-01-15")]
+
+    distribution = get_delay_distribution(start=date(2025, 1, 15), eva="A", sketches_dir=sketches_dir)
+    pd.testing.assert_series_equal(
+        distribution, selected["delay_in_min"].value_counts().sort_index(), check_names=False, check_index_type=False
+    )
+
+    quantiles = get_delay_quantiles([0.5, 0.9, 0.99], start=date(2025, 1, 15), eva="A", sketches_dir=sketches_dir)
+    expected = np.quantile(selected["delay_in_min"], [0.5, 0.9, 0.99], method="inverted_cdf")
+    assert list(quantiles.values()) == list(expected)
+
+    # Filter values are bound as parameters, so quotes do not change the query
+    assert get_delay_distribution(eva="A' OR eva <> '", sketches_dir=sketches_dir).empty
+
+
+def test_distinct_rides_estimate(tmp_path, releases):
+    sketches_dir = tmp_path / "sketches"
+    for train_type in ["ICE", None]:
+        estimate = get_distinct_rides(train_type=train_type, sketches_dir=sketches_dir)
+        selected = releases if train_type is None else releases[releases["train_type"] == train_type]
+        assert estimate == pytest.approx(selected["train_line_ride_id"].nunique(), rel=0.1)
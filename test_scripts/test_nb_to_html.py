@@ -0,0 +1,119 @@
+import nbformat
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+
+from notebooks.src import nb_to_html, to_html
+
+
+def test_build_hash_only_changes_with_code_and_inputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(nb_to_html, "REPO_DIR", tmp_path)
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "cube-2025-01.parquet").write_bytes(b"january")
+    notebook_path = tmp_path / "page.ipynb"
+    nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("x = 1")])
+    nbformat.write(nb, notebook_path)
+
+    def get_build_hash():
+        nb_to_html.get_file_hash.cache_clear()
+        return nb_to_html.get_build_hash(notebook_path, ["data/cube-*.parquet"])
+
+    build_hash = get_build_hash()
+
+    # Outputs and metadata written by a run do not change the hash
+    nb.cells[0].outputs = [nbformat.v4.new_output("stream", text="1")]
+    nb.metadata["build_hash"] = build_hash
+    nbformat.write(nb, notebook_path)
+    assert get_build_hash() == build_hash
+
+    (tmp_path / "data" / "cube-2025-01.parquet").write_bytes(b"january v2")
+    input_hash = get_build_hash()
+    assert input_hash != build_hash
+
+    (tmp_path / "data" / "cube-2025-02.parquet").write_bytes(b"february")
+    new_month_hash = get_build_hash()
+    assert new_month_hash != input_hash
+
+    nb.cells[0].source = "x = 2"
+    nbformat.write(nb, notebook_path)
+    assert get_build_hash() != new_month_hash
+
+
+def test_notebook_is_rebuilt_when_a_template_changes(tmp_path, monkeypatch):
+    templates_dir = tmp_path / "templates"
+    templates_dir.mkdir()
+    (templates_dir / "table_div.html").write_text("<table></table>")
+    monkeypatch.setattr(nb_to_html, "REPO_DIR", tmp_path)
+    monkeypatch.setattr(nb_to_html, "NOTEBOOKS_DIR", tmp_path)
+    monkeypatch.setattr(nb_to_html, "TEMPLATES_DIR", templates_dir)
+    nbformat.write(nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("x = 1")]), tmp_path / "page.ipynb")
+    pages = [{"name": "page", "filename": "page", "inputs": []}]
+
+    assert nb_to_html.run_notebooks(pages, jobs=1)["page"][0] == "ran"
+    assert nb_to_html.run_notebooks(pages, jobs=1)["page"][0] == "unchanged"
+
+    (templates_dir / "table_div.html").write_text("<div><table></table></div>")
+    assert nb_to_html.run_notebooks(pages, jobs=1)["page"][0] == "ran"
+
+
+def test_plotly_is_loaded_once_per_page_with_plots(tmp_path):
+    figure = go.Figure(go.Bar(x=["ICE", "RE"], y=[3.5, 1.2]))
+    for name, html in [("plots", to_html.plot(figure) + to_html.plot(figure)), ("text", "<p>Keine Plots</p>")]:
+        output = nbformat.v4.new_output("display_data", data={"text/html": html})
+        nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("", outputs=[output])])
+        nbformat.write(nb, tmp_path / f"{name}.ipynb")
+
+    nb_to_html.convert_notebook_to_html(str(tmp_path / "plots.ipynb"), str(tmp_path / "plots.html"))
+    nb_to_html.convert_notebook_to_html(str(tmp_path / "text.ipynb"), str(tmp_path / "text.html"))
+
+    plots_html = (tmp_path / "plots.html").read_text()
+    assert plots_html.count("<script src=") == 1
+    assert f'<script src="{nb_to_html.PLOTLY_ASSET}">' in plots_html
+    assert plots_html.count("Plotly.newPlot(") == 2
+    assert "var Plotly=" not in plots_html
+    assert (tmp_path / nb_to_html.PLOTLY_ASSET).read_text() == get_plotlyjs()
+    assert "<script src=" not in (tmp_path / "text.html").read_text()
+
+    url = "https://cdn.plot.ly/plotly-3.1.0.min.js"
+    nb_to_html.convert_notebook_to_html(str(tmp_path / "plots.ipynb"), str(tmp_path / "plots.html"), plotly_url=url)
+    assert f'<script src="{url}">' in (tmp_path / "plots.html").read_text()
+
+
+def test_charts_script_is_written_for_pages_with_charts(tmp_path):
+    output = nbformat.v4.new_output("display_data", data={"text/html": to_html.chart("data/delays.json", "Verspätung")})
+    nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("", outputs=[output])])
+    nbformat.write(nb, tmp_path / "charts.ipynb")
+
+    nb_to_html.convert_notebook_to_html(str(tmp_path / "charts.ipynb"), str(tmp_path / "charts.html"))
+
+    html = (tmp_path / "charts.html").read_text()
+    assert f'<script src="{nb_to_html.PLOTLY_ASSET}">' in html
+    assert f'<script src="{nb_to_html.CHARTS_ASSET}" defer>' in html
+    assert (tmp_path / nb_to_html.CHARTS_ASSET).read_text() == (nb_to_html.TEMPLATES_DIR / "charts.js").read_text()
+
+
+def test_images_and_charts_no_page_links_to_are_removed(tmp_path):
+    files = [
+        "data/uhrzeit/delays.png",
+        "data/verspaetungsverlauf_ice.png",
+        "data/kumulative_verteilung.png",
+        "data/delays.json",
+        "data/uhrzeit/delays.json",
+        "data/bahnhof/8000001.json",
+    ]
+    for file in files:
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_bytes(b"{}")
+    (tmp_path / "verspaetungsverlauf.html").write_text('<img src="data/verspaetungsverlauf_ice.png">')
+    (tmp_path / "allgemein.html").write_text('<div class="chart" data-src="data/delays.json"></div>')
+    (tmp_path / "bahnhof.html").write_text('<script>const shardUrl = "data/bahnhof";</script>')
+
+    assert nb_to_html.remove_unused_data_files(tmp_path) == [
+        tmp_path / "data/kumulative_verteilung.png",
+        tmp_path / "data/uhrzeit/delays.json",
+        tmp_path / "data/uhrzeit/delays.png",
+    ]
+    assert sorted(path.name for path in (tmp_path / "data").rglob("*.*")) == [
+        "8000001.json",
+        "delays.json",
+        "verspaetungsverlauf_ice.png",
+    ]
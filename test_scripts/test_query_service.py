@@ -0,0 +1,82 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+from aiohttp.test_utils import TestClient, TestServer
+
+from scripts.load_test_query_service import run_load_test
+from scripts.query_service import QueryEngine, create_app
+
+
+def write_release(data_dir, year, month, seed):
+    rng = np.random.default_rng(seed)
+    n = 1000
+    release = pd.DataFrame(
+        {
+            "eva": rng.choice(["08000105", "08000261"], n),
+            "station_name": "Station",
+            "time": pd.Timestamp(year, month, 1) + pd.to_timedelta(rng.integers(0, 28 * 24 * 60, n), unit="m"),
+            "train_type": rng.choice(["ICE", "RE", None], n),
+            "train_number": rng.choice(["1", "2"], n),
+            "line_number": rng.choice(["RE1", None], n),
+            "train_line_station_num": rng.integers(1, 10, n).astype("int32"),
+            "delay_in_min": rng.integers(0, 12, n).astype("int32"),
+            "is_canceled": rng.random(n) < 0.1,
+        }
+    )
+    release.to_parquet(data_dir / f"data-{year}-{month:02d}.parquet", index=False)
+    return release
+
+
+async def get_json(client, path):
+    response = await client.get(path)
+    assert response.status == 200, await response.text()
+    return await response.json()
+
+
+def test_station_stats_are_cached_until_a_new_file_appears(tmp_path):
+    january = write_release(tmp_path, 2025, 1, seed=1)
+    engine = QueryEngine(tmp_path, pool_size=2)
+
+    async def run():
+        async with TestClient(TestServer(create_app(engine))) as client:
+            stats = await get_json(client, "/stations/08000105?start=2025-01-05&end=2025-01-20")
+            assert engine.cache_misses == 1
+            assert await get_json(client, "/stations/08000105?start=2025-01-05&end=2025-01-20") == stats
+            assert engine.cache_hits == 1
+
+            days = january["time"].dt.date.astype(str)
+            selected = january[(january["eva"] == "08000105") & (days >= "2025-01-05") & (days <= "2025-01-20")]
+            # Stops without a train type are a group of their own, only the rollup is "Alle"
+            assert sorted(str(row["train_type"]) for row in stats) == ["Alle", "ICE", "None", "RE"]
+            total = next(row for row in stats if row["train_type"] == "Alle")
+            assert total["stops"] == len(selected)
+            assert total["mean_delay_in_min"] == selected[~selected["is_canceled"]]["delay_in_min"].mean()
+
+            february = write_release(tmp_path, 2025, 2, seed=2)
+            assert len(await get_json(client, "/daily")) == 56
+            assert (await get_json(client, "/cache"))["files"] == ["data-2025-01.parquet", "data-2025-02.parquet"]
+            assert await get_json(client, "/stations/08000105?start=2025-01-05&end=2025-01-20") == stats
+            assert engine.cache_misses == 3
+
+            trains = await get_json(client, "/trains/1")
+            releases = pd.concat([january, february])
+            assert sum(row["stops"] for row in trains) == (releases["train_number"] == "1").sum()
+            assert (await client.get("/stations/08000105?start=yesterday")).status == 400
+
+    asyncio.run(run())
+
+
+def test_load_test_reports_queries_per_second(tmp_path):
+    write_release(tmp_path, 2025, 1, seed=1)
+    engine = QueryEngine(tmp_path)
+
+    async def run():
+        async with TestServer(create_app(engine)) as server:
+            return await run_load_test(str(server.make_url("")), 200, 8, 2, None, None)
+
+    result = asyncio.run(run())
+    assert result["requests"] == 200
+    assert result["errors"] == 0
+    # Station list, daily stats and the two stations are each queried once
+    assert result["cache_misses"] == 4
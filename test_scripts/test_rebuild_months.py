@@ -0,0 +1,118 @@
+from pathlib import Path
+
+import create_monthly_data_release
+import duckdb
+import pandas as pd
+import pytest
+
+from scripts.create_monthly_data_release import RELEASE_ARTIFACTS, RELEASE_LAYOUT, get_parquet_files, main
+from scripts.rebuild_months import collect_raw_files, get_worker_count, month_range, rebuild_months
+
+
+def test_month_range_crosses_year_boundary():
+    assert month_range("2024-11", "2025-02") == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+
+    with pytest.raises(ValueError, match="after end"):
+        month_range("2025-02", "2025-01")
+
+
+def test_worker_count_respects_memory_budget():
+    assert get_worker_count("12GB", "4GB", max_workers=8) == 3
+    assert get_worker_count("2GB", "4GB", max_workers=8) == 1
+    assert get_worker_count("64GB", "4GB", max_workers=2) == 2
+
+
+def test_boundary_days_are_collected_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for day_dir in ["year=2025/month=1/day=31", "year=2025/month=2/day=1", "year=2025/month=2/day=28"]:
+        path = Path("raw_data") / day_dir
+        path.mkdir(parents=True)
+        (path / "hour_00.parquet").touch()
+
+    files_per_month, unique_files = collect_raw_files([(2025, 1), (2025, 2)])
+
+    assert len(unique_files) == 3
+    boundary_file = Path("raw_data/year=2025/month=2/day=1/hour_00.parquet")
+    assert boundary_file in files_per_month[(2025, 1)]
+    assert boundary_file in files_per_month[(2025, 2)]
+
+
+def test_rebuild_months_writes_every_month(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # The last day of January is read by both January and February
+    raw_dir = Path("raw_data/year=2025/month=1/day=31")
+    raw_dir.mkdir(parents=True)
+    input_df = pd.read_csv(
+        Path(__file__).parent / "test_data/valid_input.csv", dtype={"status_code": str}, parse_dates=["timestamp"]
+    )
+    input_df.to_parquet(raw_dir / "hour_10.parquet", index=False)
+
+    # Count the hashed raw files in a file, the months are processed in worker processes
+    get_parse_cache_key = create_monthly_data_release.get_parse_cache_key
+
+    def count_parse_cache_key(parquet_file):
+        with open(tmp_path / "hashed.txt", "a") as f:
+            f.write(f"{parquet_file}\n")
+        return get_parse_cache_key(parquet_file)
+
+    monkeypatch.setattr(create_monthly_data_release, "get_parse_cache_key", count_parse_cache_key)
+
+    timings = rebuild_months(
+        [(2025, 1), (2025, 2)],
+        {"08000105": "Frankfurt (Main) Hbf"},
+        output_dir=Path("out"),
+        cache_dir=Path("cache"),
+        memory_budget="2GB",
+        memory_per_month="1GB",
+        daily_aggregates=True,
+        first_month=(2025, 1),
+    )
+
+    assert set(timings) == {"2025-01", "2025-02"}
+    assert len(list(Path("cache").rglob("meta.json"))) == 1
+    # The merge reuses the cache entries of the parse instead of hashing the raw file again
+    assert len((tmp_path / "hashed.txt").read_text().splitlines()) == 1
+    assert len(pd.read_parquet("out/data-2025-01.parquet")) == 2
+    assert len(pd.read_parquet("out/data-2025-02.parquet")) == 0
+    # February has no stops, so its prefix sums only carry over the January totals
+    january = pd.read_parquet("out/daily_aggregates/prefix-sums-2025-01.parquet")
+    february = pd.read_parquet("out/daily_aggregates/prefix-sums-2025-02.parquet")
+    assert january["stops"].sum() == 2
+    assert february["stops"].sum() == 2
+
+
+def test_rebuilt_month_matches_the_release(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    raw_dir = Path("raw_data/year=2025/month=1/day=10")
+    raw_dir.mkdir(parents=True)
+    input_df = pd.read_csv(
+        Path(__file__).parent / "test_data/edge_cases_input.csv", dtype={"status_code": str}, parse_dates=["timestamp"]
+    )
+    input_df.to_parquet(raw_dir / "hour_10.parquet", index=False)
+    eva_to_station = {"08000105": "Frankfurt (Main) Hbf"}
+
+    rebuild_months([(2025, 1)], eva_to_station, Path("rebuilt"), Path("cache"), "2GB", "1GB")
+    main(
+        2025, 1, get_parquet_files(2025, 1), eva_to_station, Path("release"), layout=RELEASE_LAYOUT, **RELEASE_ARTIFACTS
+    )
+
+    def get_artifacts(output_dir):
+        return sorted(path.relative_to(output_dir) for path in output_dir.rglob("*.parquet"))
+
+    assert get_artifacts(Path("rebuilt")) == get_artifacts(Path("release"))
+    assert len(get_artifacts(Path("rebuilt"))) > 10
+
+    def get_layout(release_file):
+        return duckdb.sql(f"""
+            SELECT row_group_id, row_group_num_rows, list(DISTINCT compression ORDER BY compression)
+            FROM parquet_metadata('{release_file}')
+            GROUP BY ALL
+            ORDER BY row_group_id
+        """).fetchall()
+
+    rebuilt_layout = get_layout("rebuilt/data-2025-01.parquet")
+    assert rebuilt_layout == get_layout("release/data-2025-01.parquet")
+    assert {row[2][0] for row in rebuilt_layout} == {"ZSTD"}
+    pd.testing.assert_frame_equal(
+        pd.read_parquet("rebuilt/data-2025-01.parquet"), pd.read_parquet("release/data-2025-01.parquet")
+    )
@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+
+from notebooks.src.release_data import get_release, get_release_files
+
+
+def write_release(data_dir, month, train_types):
+    release = pd.DataFrame(
+        {
+            "train_type": train_types,
+            "delay_in_min": pd.Series(range(len(train_types)), dtype="int32"),
+            "is_canceled": [i % 3 == 0 for i in range(len(train_types))],
+            "station_name": "Bonn",
+        }
+    )
+    release.to_parquet(data_dir / f"data-2025-{month:02d}.parquet", index=False)
+    return release
+
+
+def test_release_is_read_from_the_arrow_cache(tmp_path):
+    for month in [1, 2, 3]:
+        write_release(tmp_path, month, ["ICE", "RE", "ICE", None])
+    files = get_release_files(months=2, data_dir=tmp_path)
+    assert [file.name for file in files] == ["data-2025-02.parquet", "data-2025-03.parquet"]
+
+    cache_dir = tmp_path / "arrow_cache"
+    query = "SELECT train_type, sum(delay_in_min) AS delay FROM release WHERE NOT is_canceled GROUP BY ALL ORDER BY ALL"
+    release = get_release(files, ["train_type", "delay_in_min", "is_canceled"], cache_dir=cache_dir)
+    expected = release.query("release", query).df()
+    assert expected.to_dict("list") == {"train_type": ["ICE", "RE"], "delay": [4.0, 2.0]}
+    assert sorted(path.name.split("-")[0] for path in (cache_dir / "data-2025-03").iterdir()) == [
+        "delay_in_min",
+        "is_canceled",
+        "train_type",
+    ]
+
+    uncached = get_release(files, ["train_type", "delay_in_min", "is_canceled"], use_cache=False)
+    pd.testing.assert_frame_equal(uncached.query("release", query).df(), expected)
+
+    # A replaced release file is read again instead of using the stale cache
+    write_release(tmp_path, 3, ["S", "S", "S", "S"])
+    os.utime(files[-1], ns=(0, 0))
+    release = get_release(files, ["train_type"], cache_dir=cache_dir)
+    assert release.filter("train_type = 'S'").count("*").fetchone() == (4,)
+    assert len(list((cache_dir / "data-2025-03").glob("train_type-*.arrow"))) == 1
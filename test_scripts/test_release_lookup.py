@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+
+from scripts.create_monthly_data_release import write_board_index, write_ride_index
+from scripts.release_lookup import (
+    get_board,
+    get_board_index_file,
+    get_ride,
+    get_ride_index_file,
+    get_train_number_rides,
+)
+
+
+def write_release(tmp_path, num_rows=10_000):
+    release_file = tmp_path / "data-2025-01.parquet"
+    con = duckdb.connect()
+    con.execute(f"""
+        COPY (
+            SELECT
+                'ride-' || (i % 700) AS train_line_ride_id,
+                CAST(i % 70 AS VARCHAR) AS train_number,
+                CASE WHEN i % 2 = 0 THEN 'ICE' ELSE 'RE' END AS train_type,
+                CAST(i // 700 + 1 AS INTEGER) AS train_line_station_num,
+                TIMESTAMP '2025-01-01' + to_minutes(i) AS time
+            FROM range({num_rows}) t(i)
+            ORDER BY time
+        ) TO '{release_file}' (FORMAT PARQUET, ROW_GROUP_SIZE 2048)
+    """)
+    write_ride_index(con, release_file, get_ride_index_file(release_file))
+    return release_file
+
+
+def test_ride_index_lists_the_row_groups_of_every_ride(tmp_path):
+    release_file = write_release(tmp_path)
+    assert pq.ParquetFile(release_file).num_row_groups > 1
+
+    index = pd.read_parquet(get_ride_index_file(release_file)).set_index("train_line_ride_id")
+    release = pd.read_parquet(release_file)
+    release["row_group"] = release.index // pq.ParquetFile(release_file).metadata.row_group(0).num_rows
+
+    for ride_id, stops in release.groupby("train_line_ride_id"):
+        assert list(index.loc[ride_id, "row_groups"]) == sorted(stops["row_group"].unique())
+        assert index.loc[ride_id, "stops"] == len(stops)
+
+
+def test_lookups_return_whole_journeys(tmp_path):
+    release_file = write_release(tmp_path)
+    release = pd.read_parquet(release_file)
+
+    ride = get_ride("ride-5", [release_file])
+    expected = release[release["train_line_ride_id"] == "ride-5"].sort_values("train_line_station_num")
+    pd.testing.assert_frame_equal(ride, expected.reset_index(drop=True))
+
+    rides = get_train_number_rides("5", [release_file], train_type="RE")
+    assert set(rides["train_line_ride_id"]) == {f"ride-{i}" for i in range(5, 700, 70)}
+    assert len(rides) == len(release[release["train_number"] == "5"])
+
+
+def test_board_returns_the_stops_of_a_station_in_a_time_range(tmp_path):
+    release_file = tmp_path / "data-2025-01.parquet"
+    con = duckdb.connect()
+    con.execute(f"""
+        COPY (
+            SELECT
+                lpad(CAST(8000000 + i % 50 AS VARCHAR), 8, '0') AS eva,
+                TIMESTAMP '2025-01-01' + to_seconds(i * 30) AS time
+            FROM range(20_000) t(i)
+            ORDER BY time, eva
+        ) TO '{release_file}' (FORMAT PARQUET, ROW_GROUP_SIZE 2048)
+    """)
+    write_board_index(con, release_file, get_board_index_file(release_file))
+
+    board = get_board("08000007", datetime(2025, 1, 2, 17, 30), datetime(2025, 1, 2, 19), release_dir=tmp_path)
+
+    release = pd.read_parquet(release_file)
+    expected = release[
+        (release["eva"] == "08000007")
+        & (release["time"] >= datetime(2025, 1, 2, 17, 30))
+        & (release["time"] < datetime(2025, 1, 2, 19))
+    ]
+    assert len(board) == 4
+    pd.testing.assert_frame_equal(board, expected.reset_index(drop=True))
+
+
+def test_lookups_without_matching_rides_return_no_stops(tmp_path):
+    release_file = write_release(tmp_path)
+
+    ride = get_ride("ride-does-not-exist", [release_file])
+    assert ride.empty
+    assert list(ride.columns) == pq.read_schema(release_file).names
+    assert get_ride("ride-5", []).empty
+
+
+def test_months_without_a_ride_index_are_read_with_filters(tmp_path):
+    release_file = write_release(tmp_path)
+    expected = get_ride("ride-5", [release_file])
+
+    get_ride_index_file(release_file).unlink()
+
+    pd.testing.assert_frame_equal(get_ride("ride-5", [release_file]), expected)
+    assert get_ride("ride-does-not-exist", [release_file]).empty
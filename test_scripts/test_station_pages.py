@@ -0,0 +1,55 @@
+import json
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from notebooks.src.station_pages import SHARD_DIR, build_station_page
+from notebooks.src.stats_cube import get_cube_files
+from scripts.create_monthly_data_release import write_stats_cube
+
+
+def test_station_page_has_a_shard_per_station(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 2000
+    release = pd.DataFrame(
+        {
+            "eva": rng.choice(["8000001", "8000002"], n, p=[0.7, 0.3]),
+            "station_name": None,
+            "train_type": rng.choice(["ICE", "RE", None], n),
+            "train_number": rng.choice(["1", "2"], n),
+            "time": pd.Timestamp(2025, 7, 1) + pd.to_timedelta(rng.integers(0, 31 * 24 * 60, n), unit="m"),
+            "delay_in_min": rng.integers(-2, 30, n).astype("int32"),
+            "is_canceled": rng.random(n) < 0.1,
+        }
+    )
+    release["station_name"] = release["eva"].map({"8000001": "Köln Hbf", "8000002": "Bonn Hbf"})
+    release.to_parquet(tmp_path / "data-2025-07.parquet", index=False)
+    write_stats_cube(duckdb.connect(), tmp_path / "data-2025-07.parquet", tmp_path / "stats_cube", 2025, 7)
+
+    output_dir = tmp_path / "stats"
+    (output_dir / SHARD_DIR).mkdir(parents=True)
+    (output_dir / SHARD_DIR / "8000003.json").write_text("{}")
+
+    files = get_cube_files(cube_dir=tmp_path / "stats_cube")
+    assert build_station_page(files, output_dir, jobs=2) == 2
+
+    shard_dir = output_dir / SHARD_DIR
+    assert sorted(path.name for path in shard_dir.iterdir()) == ["8000001.json", "8000002.json", "index.json"]
+    assert json.loads((shard_dir / "index.json").read_text()) == [["8000001", "Köln Hbf"], ["8000002", "Bonn Hbf"]]
+
+    shard = json.loads((shard_dir / "8000002.json").read_text())
+    station = release[release["eva"] == "8000002"]
+    not_canceled = station[~station["is_canceled"]]
+    assert shard["station_name"] == "Bonn Hbf"
+    assert shard["stats"]["stops"] == len(station)
+    assert shard["stats"]["mean_delay_in_min"] == pytest.approx(not_canceled["delay_in_min"].mean(), abs=1e-4)
+    assert shard["stats"]["canceled_rate"] == pytest.approx(station["is_canceled"].mean(), abs=1e-4)
+    assert [row[0] for row in shard["train_types"]] == station["train_type"].value_counts().index.tolist()
+    assert shard["charts"][1]["data"][0]["x"][0] == "2025-07-01"
+
+    html = (output_dir / "bahnhof.html").read_text()
+    assert '<script src="plotly.min.js">' in html
+    assert '<script src="charts.js" defer>' in html
+    assert (output_dir / "charts.js").exists()
@@ -0,0 +1,106 @@
+import duckdb
+import numpy as np
+import pandas as pd
+
+from notebooks.src.stats_cube import (
+    get_cube_files,
+    get_delay_distribution,
+    get_delay_distributions,
+    get_month_range,
+    get_stats,
+    get_stats_per_train_type,
+)
+from scripts.create_monthly_data_release import write_stats_cube
+
+
+def write_release(tmp_path, year, month, seed):
+    rng = np.random.default_rng(seed)
+    n = 3000
+    release = pd.DataFrame(
+        {
+            "eva": rng.choice(["A", "B", "C"], n),
+            "station_name": rng.choice(["Aachen", "Bonn", "Celle"], n),
+            "train_type": rng.choice(["ICE", "RE", None], n),
+            "train_number": rng.choice(["1", "2", "3"], n),
+            "time": pd.Timestamp(year, month, 1) + pd.to_timedelta(rng.integers(0, 28 * 24 * 60, n), unit="m"),
+            "delay_in_min": rng.integers(-2, 30, n).astype("int32"),
+            "is_canceled": rng.random(n) < 0.1,
+        }
+    )
+    release_file = tmp_path / f"data-{year}-{month:02d}.parquet"
+    release.to_parquet(release_file, index=False)
+    return release_file, release
+
+
+def test_stats_cube_matches_the_stops(tmp_path):
+    con = duckdb.connect()
+    releases = []
+    for month in [1, 2]:
+        release_file, release = write_release(tmp_path, 2025, month, seed=month)
+        write_stats_cube(con, release_file, tmp_path / "stats_cube", 2025, month)
+        releases.append(release)
+    release = pd.concat(releases, ignore_index=True)
+    not_canceled = release[~release["is_canceled"]]
+
+    files = get_cube_files(cube_dir=tmp_path / "stats_cube")
+    assert get_month_range(files) == ("2025-01", "2025-02")
+    assert get_cube_files(months=1, cube_dir=tmp_path / "stats_cube") == files[-1:]
+
+    stats = get_stats(files, ["station_name", "hour"], "train_type = 'ICE'").set_index(["station_name", "hour"])
+    ice = release[release["train_type"] == "ICE"]
+    groups = [ice["station_name"], ice["time"].dt.hour.rename("hour")]
+    expected = pd.DataFrame(
+        {
+            "stops": ice.groupby(groups).size(),
+            "canceled_rate": ice.groupby(groups)["is_canceled"].mean(),
+            "mean_delay_in_min": ice[~ice["is_canceled"]].groupby(groups)["delay_in_min"].mean(),
+            "punctual_rate": (ice[~ice["is_canceled"]]["delay_in_min"] < 6).groupby(groups).mean(),
+        }
+    )
+    pd.testing.assert_frame_equal(
+        stats[expected.columns], expected, check_dtype=False, check_names=False, check_index_type=False
+    )
+
+    total = get_stats(files).iloc[0]
+    assert total["stops"] == len(release)
+    assert total["not_canceled_stops"] == len(not_canceled)
+
+    distribution = get_delay_distribution(files, "eva = 'B'")
+    expected_distribution = not_canceled[not_canceled["eva"] == "B"]["delay_in_min"].value_counts().sort_index()
+    pd.testing.assert_series_equal(distribution, expected_distribution, check_names=False, check_index_type=False)
+
+    trains = duckdb.sql(f"""
+        SELECT train_type, train_number, sum(stops) AS stops, sum(delay_sum_in_min) AS delay_sum_in_min
+        FROM '{tmp_path / "stats_cube" / "trains-*.parquet"}'
+        WHERE train_type = 'RE'
+        GROUP BY ALL
+        ORDER BY train_number
+    """).df()
+    re_trains = release[release["train_type"] == "RE"].groupby("train_number")["delay_in_min"].agg(["size", "sum"])
+    assert trains["stops"].tolist() == re_trains["size"].tolist()
+    assert trains["delay_sum_in_min"].tolist() == re_trains["sum"].tolist()
+
+
+def test_stats_per_train_type_match_filtered_stats(tmp_path):
+    con = duckdb.connect()
+    release_file, _ = write_release(tmp_path, 2025, 1, seed=3)
+    write_stats_cube(con, release_file, tmp_path / "stats_cube", 2025, 1)
+    files = get_cube_files(cube_dir=tmp_path / "stats_cube")
+
+    for by in [(), ["station_name", "hour"]]:
+        tables = get_stats_per_train_type(files, by, train_types=["ICE", "IC"])
+        assert list(tables) == ["Alle", "ICE", "IC"]
+        pd.testing.assert_frame_equal(tables["Alle"], get_stats(files, by), check_dtype=False)
+        pd.testing.assert_frame_equal(tables["ICE"], get_stats(files, by, "train_type = 'ICE'"), check_dtype=False)
+        assert tables["IC"].empty if by else tables["IC"]["stops"].item() == 0
+
+    distributions = get_delay_distributions(files, train_types=["ICE"])
+    pd.testing.assert_series_equal(
+        distributions["Alle"], get_delay_distribution(files), check_names=False, check_index_type=False
+    )
+    pd.testing.assert_series_equal(
+        distributions["ICE"],
+        get_delay_distribution(files, "train_type = 'ICE'"),
+        check_names=False,
+        check_index_type=False,
+    )
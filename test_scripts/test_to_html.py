@@ -0,0 +1,18 @@
+import json
+import re
+
+import pandas as pd
+
+from notebooks.src.to_html import table
+
+
+def test_table_embeds_cells_as_column_json():
+    df = pd.DataFrame({"Bahnhof": ["Köln Hbf", "</script>"], "Halte": [10, 2], "Pünktlich [%]": [81.5, 90.0]})
+
+    html = table(df)
+
+    data = re.search(r'<script type="application/json"[^>]*>(.*?)</script>', html, re.DOTALL).group(1)
+    assert "</script>" not in data
+    assert json.loads(data) == [["Köln Hbf", "</script>"], ["10", "2"], ["81.5", "90.0"]]
+    assert "<td>" not in html
+    assert "Pünktlich [%] &#8661;" in html